@@ -3,52 +3,35 @@
 import os, sys, json, queue
 from pathlib import Path
 from PyQt5 import QtWidgets, QtCore, QtGui
-from mouse_remapper_core import RemapperScroll, list_pointer_candidates
+from mouse_remapper_core import RemapperScroll, RemapperProcess, DaemonClient, DirWatch, list_pointer_candidates, format_record, DEV_DIR, LOG_OFF, LOG_ALL, LIVE_PARAMS, CALIBRATE_MIN, HOLD_RANGE, CLICK_RANGE
+from mouse_remapper_config import load_cfg, save_cfg, CFG
 
-APP = "genius-remapper"
-CFG_DIR = Path.home()/".config"/APP
-CFG = CFG_DIR/"config.json"
 AUTOSTART_DIR = Path.home()/".config"/"autostart"
 AUTOSTART = AUTOSTART_DIR/"genius-remapper.desktop"
-
-DEFAULTS = dict(
-    device_name="Genius Wireless Mouse", vendor=0x0458, product=0x0189,
-    scroll_idle=0.15, div_y=10.0, div_x=8.0,
-    deadzone=0.0, max_step=1, hold_grace=0.05, click_gap=0.02,
-    remember=True, autostart=False, run_enabled=False
-)
-
-def load_cfg():
-    try:
-        if CFG.exists():
-            stored = json.loads(CFG.read_text())
-            if "hold_grace" not in stored and "tick_grace" in stored:
-                stored["hold_grace"] = stored.get("tick_grace", DEFAULTS["hold_grace"])
-            if "click_gap" not in stored:
-                stored["click_gap"] = DEFAULTS["click_gap"]
-            if "run_enabled" not in stored:
-                stored["run_enabled"] = DEFAULTS["run_enabled"]
-            if stored.get("remember", True):
-                return {**DEFAULTS, **stored}
-            keep = {k: stored.get(k, DEFAULTS[k]) for k in ("remember", "autostart", "run_enabled")}
-            return {**DEFAULTS, **keep}
-    except Exception: pass
-    return dict(DEFAULTS)
-
-def save_cfg(c):
-    CFG_DIR.mkdir(parents=True, exist_ok=True)
-    payload = dict(c)
-    if not payload.get("remember", True):
-        payload = {k: payload[k] for k in ("remember", "autostart", "run_enabled")}
-    CFG.write_text(json.dumps(payload, indent=2))
-
-def set_autostart(on):
+# Where a headless autostart daemon serves its control socket; the window attaches there.
+HEADLESS_SOCKET = os.path.join(os.environ["XDG_RUNTIME_DIR"], "genius-remapper.sock") if os.environ.get("XDG_RUNTIME_DIR") else None
+PUMP_MS, PUMP_HIDDEN_MS = 50, 500
+SAVE_DEBOUNCE_MS = 500
+LOG_LINES_PER_TICK = 200
+
+def arg_value(flag):
+    if flag in sys.argv:
+        i = sys.argv.index(flag)
+        if i + 1 < len(sys.argv): return sys.argv[i + 1]
+    return None
+
+def set_autostart(on, headless=False):
     AUTOSTART_DIR.mkdir(parents=True, exist_ok=True)
     if on:
         exe = sys.executable or "python3"
         script = os.path.abspath(sys.argv[0])
+        if headless:
+            # Only the input loop: no PyQt5 at login.
+            cmd = f"{exe} -m mouse_remapper_core --config {CFG}" + (f" --socket {HEADLESS_SOCKET}" if HEADLESS_SOCKET else "")
+        else:
+            cmd = f"{exe} {script} --autostart"
         AUTOSTART.write_text(
-            f"[Desktop Entry]\nType=Application\nName=Genius Remapper\nExec={exe} {script} --autostart\nX-GNOME-Autostart-enabled=true\n"
+            f"[Desktop Entry]\nType=Application\nName=Genius Remapper\nExec={cmd}\nPath={os.path.dirname(script)}\nX-GNOME-Autostart-enabled=true\n"
         )
     else:
         if AUTOSTART.exists(): AUTOSTART.unlink()
@@ -59,10 +42,12 @@ class Main(QtWidgets.QMainWindow):
         self.setWindowTitle("Genius Remapper (Scroll only)")
         self.setMinimumSize(700, 520)
         self.cfg = load_cfg()
-        self.keys = list_pointer_candidates()
-        self.q_in = queue.Queue()
+        self.keys = None  # (name, vendor, product) per combo entry, see refresh_devices()
         self.q_act = queue.Queue()
         self.remap = None
+        self.state = {}  # last status() of the remapper, see update_latency()
+        self.tel_seq = 0
+        self.dropped = 0
         self.autostart_cache = self.cfg.get("autostart", False)
         self._loading = False
 
@@ -84,12 +69,25 @@ class Main(QtWidgets.QMainWindow):
         device_box = QtWidgets.QGroupBox("Pointer device")
         device_form = QtWidgets.QFormLayout(device_box)
         self.cb_dev = QtWidgets.QComboBox()
-        self.cb_dev.addItems([f"{n} (v={hex(v)} p={hex(p)})" for n,v,p in self.keys] or ["(no devices)"])
+        self.refresh_devices()
         tip_device = "Pick the physical mouse to grab and remap."
         self.cb_dev.setToolTip(tip_device)
         lbl_dev = QtWidgets.QLabel("Device:"); lbl_dev.setToolTip(tip_device)
-        device_form.addRow(lbl_dev, self.cb_dev)
+        self.btn_rescan = QtWidgets.QToolButton(); self.btn_rescan.setText("Rescan")
+        self.btn_rescan.setIcon(QtGui.QIcon.fromTheme("view-refresh"))
+        self.btn_rescan.setToolTip("Look for pointer devices again (the list also follows hotplug).")
+        self.btn_rescan.clicked.connect(self.refresh_devices)
+        dev_row = QtWidgets.QHBoxLayout(); dev_row.addWidget(self.cb_dev, 1); dev_row.addWidget(self.btn_rescan)
+        device_form.addRow(lbl_dev, dev_row)
         outer.addWidget(device_box)
+        # Mice plugged in (or woken up) later: /dev/input changes, the list follows.
+        try:
+            self.dev_watch = DirWatch(DEV_DIR, removed=True)
+            self.dev_notifier = QtCore.QSocketNotifier(self.dev_watch.fd, QtCore.QSocketNotifier.Read, self)
+            self.dev_notifier.activated.connect(self.on_dev_dir)
+        except OSError as e:
+            self.dev_watch = None
+            self.q_act.put(f"Device list won't follow hotplug: {e}")
 
         scroll_box = QtWidgets.QGroupBox("Scroll tuning")
         scroll_form = QtWidgets.QFormLayout(scroll_box)
@@ -108,23 +106,45 @@ class Main(QtWidgets.QMainWindow):
         self.sb_max = QtWidgets.QSpinBox(); self.sb_max.setRange(1,10)
         tip_max = "Cap emitted wheel steps per frame so scroll bursts stay smooth."
         self.sb_max.setToolTip(tip_max)
+        self.chk_hires = QtWidgets.QCheckBox()
+        tip_hires = "Emit high-resolution wheel events (1/120 detent) as soon as you move; apps without hi-res support still get whole detents."
+        self.chk_hires.setToolTip(tip_hires)
+        self.sb_pace = QtWidgets.QSpinBox(); self.sb_pace.setRange(0,240); self.sb_pace.setSingleStep(24); self.sb_pace.setSuffix(" Hz")
+        self.sb_pace.setSpecialValueText("With input")
+        tip_pace = "Emit scroll at this fixed rate (e.g. your display's 120/144 Hz) instead of on every mouse report."
+        self.sb_pace.setToolTip(tip_pace)
+        self.sb_momentum = QtWidgets.QDoubleSpinBox(); self.sb_momentum.setRange(0.0,2.0); self.sb_momentum.setSingleStep(0.05); self.sb_momentum.setSuffix(" s")
+        self.sb_momentum.setSpecialValueText("Off")
+        tip_momentum = "Keep scrolling after lift-off, slowing down with this time constant (needs a fixed output rate)."
+        self.sb_momentum.setToolTip(tip_momentum)
         scroll_form.addRow(self._with_tip("Scroll idle:", tip_idle), self.sb_idle)
         scroll_form.addRow(self._with_tip("Vertical speed (↓ faster):", tip_v), self.sb_v)
         scroll_form.addRow(self._with_tip("Horizontal speed:", tip_h), self.sb_h)
         scroll_form.addRow(self._with_tip("Deadzone:", tip_dead), self.sb_dead)
         scroll_form.addRow(self._with_tip("Max step per frame:", tip_max), self.sb_max)
+        scroll_form.addRow(self._with_tip("Hi-res wheel output:", tip_hires), self.chk_hires)
+        scroll_form.addRow(self._with_tip("Output rate:", tip_pace), self.sb_pace)
+        scroll_form.addRow(self._with_tip("Momentum:", tip_momentum), self.sb_momentum)
         outer.addWidget(scroll_box)
 
         detect_box = QtWidgets.QGroupBox("Hold && click detection")
         detect_form = QtWidgets.QFormLayout(detect_box)
-        self.sb_hold = QtWidgets.QDoubleSpinBox(); self.sb_hold.setRange(0.05,0.30); self.sb_hold.setSingleStep(0.01); self.sb_hold.setSuffix(" s")
+        self.sb_hold = QtWidgets.QDoubleSpinBox(); self.sb_hold.setRange(*HOLD_RANGE); self.sb_hold.setSingleStep(0.01); self.sb_hold.setSuffix(" s")
         tip_hold = "Max time without wheel ticks before scroll releases."
         self.sb_hold.setToolTip(tip_hold)
-        self.sb_click = QtWidgets.QDoubleSpinBox(); self.sb_click.setRange(0.02,0.20); self.sb_click.setSingleStep(0.005); self.sb_click.setDecimals(3); self.sb_click.setSuffix(" s")
+        self.sb_click = QtWidgets.QDoubleSpinBox(); self.sb_click.setRange(*CLICK_RANGE); self.sb_click.setSingleStep(0.005); self.sb_click.setDecimals(3); self.sb_click.setSuffix(" s")
         tip_click = "Window to treat a lone tick as a middle-click instead of scroll."
         self.sb_click.setToolTip(tip_click)
         detect_form.addRow(self._with_tip("Hold grace (release delay):", tip_hold), self.sb_hold)
+        self.chk_adaptive = QtWidgets.QCheckBox()
+        tip_adaptive = ("Learn both windows from this mouse's own tick timing; the values above are used until "
+                        "enough ticks have been seen.")
+        self.chk_adaptive.setToolTip(tip_adaptive)
+        self.lbl_learned = QtWidgets.QLabel("")
+        self.lbl_learned.setToolTip("Windows currently in use, per grabbed device, and the tick gaps they come from.")
         detect_form.addRow(self._with_tip("Click gap (MMB window):", tip_click), self.sb_click)
+        detect_form.addRow(self._with_tip("Auto-calibrate:", tip_adaptive), self.chk_adaptive)
+        detect_form.addRow(self.lbl_learned)
         outer.addWidget(detect_box)
 
         self.chk_run = QtWidgets.QCheckBox("Enable remapper")
@@ -134,8 +154,13 @@ class Main(QtWidgets.QMainWindow):
         self.chk_mem.setToolTip("Store current tuning so it loads next time.")
         self.chk_auto = QtWidgets.QCheckBox("Start with system"); self.chk_auto.toggled.connect(self.on_auto)
         self.chk_auto.setToolTip("Create/remove an autostart entry under ~/.config/autostart.")
+        self.chk_headless = QtWidgets.QCheckBox("Without window"); self.chk_headless.toggled.connect(self.on_headless)
+        self.chk_headless.setToolTip("Autostart only the input loop (python -m mouse_remapper_core), without Qt;\n"
+                                     "opening the window later attaches to it.")
+        self.chk_iso = QtWidgets.QCheckBox("Separate process")
+        self.chk_iso.setToolTip("Run the input loop in its own process so window activity can't delay scrolling.")
         checks_row = QtWidgets.QHBoxLayout()
-        for cb in (self.chk_run, self.chk_mem, self.chk_auto):
+        for cb in (self.chk_run, self.chk_mem, self.chk_auto, self.chk_headless, self.chk_iso):
             checks_row.addWidget(cb)
         checks_row.addStretch(1)
         outer.addLayout(checks_row)
@@ -152,19 +177,57 @@ class Main(QtWidgets.QMainWindow):
         splitter.setSizes([350, 350])
         outer.addWidget(splitter, 1)
 
-        self.status = QtWidgets.QLabel("Stopped"); outer.addWidget(self.status)
+        status_row = QtWidgets.QHBoxLayout()
+        self.status = QtWidgets.QLabel("Stopped"); status_row.addWidget(self.status, 1)
+        self.lbl_dropped = QtWidgets.QLabel("")
+        self.lbl_dropped.setToolTip("Log lines skipped to keep the window responsive during event bursts.")
+        status_row.addWidget(self.lbl_dropped)
+        self.lbl_latency = QtWidgets.QLabel("")
+        self.lbl_latency.setToolTip("Input-to-output latency (kernel event timestamp to uinput write).")
+        outer.addWidget(self.lbl_latency)
+        outer.addLayout(status_row)
 
         self.cb_dev.currentIndexChanged.connect(self.on_cfg_change)
-        for s in (self.sb_idle, self.sb_v, self.sb_h, self.sb_dead, self.sb_max, self.sb_hold, self.sb_click):
+        for s in (self.sb_idle, self.sb_v, self.sb_h, self.sb_dead, self.sb_max, self.sb_hold, self.sb_click,
+                  self.sb_pace, self.sb_momentum):
             s.valueChanged.connect(self.on_cfg_change)
+        self.chk_hires.toggled.connect(self.on_cfg_change)
+        self.chk_iso.toggled.connect(self.on_cfg_change)
+        self.chk_adaptive.toggled.connect(self.on_cfg_change)
         self.chk_mem.toggled.connect(self.on_remember_toggled)
 
+        self.save_timer = QtCore.QTimer(self); self.save_timer.setSingleShot(True)
+        self.save_timer.setInterval(SAVE_DEBOUNCE_MS); self.save_timer.timeout.connect(lambda: save_cfg(self.cfg))
+
         self.apply_cfg()
-        self.timer = QtCore.QTimer(self); self.timer.timeout.connect(self.pump); self.timer.start(50)
+        self.timer = QtCore.QTimer(self); self.timer.timeout.connect(self.pump); self.timer.start(PUMP_MS)
+        self.lat_timer = QtCore.QTimer(self); self.lat_timer.timeout.connect(self.update_latency); self.lat_timer.start(1000)
 
         if "--autostart" in sys.argv and self.cfg.get("autostart", False):
             QtCore.QTimer.singleShot(400, lambda: self.chk_run.setChecked(True))
 
+    def refresh_devices(self):
+        # Listing comes from sysfs, so this is cheap. The configured mouse stays
+        # selected, listed as not connected while it is gone (a sleeping
+        # receiver), so nothing else gets saved or grabbed in its place.
+        keys = list_pointer_candidates()
+        want = (self.cfg["device_name"], self.cfg["vendor"], self.cfg["product"])
+        missing = bool(want[0]) and want not in keys
+        if missing: keys.append(want)
+        if keys == self.keys: return
+        self.keys = keys
+        labels = [f"{n} (v={hex(v)} p={hex(p)})" for n,v,p in keys]
+        if missing: labels[-1] += " (not connected)"
+        self.cb_dev.blockSignals(True)
+        self.cb_dev.clear()
+        self.cb_dev.addItems(labels or ["(no devices)"])
+        self.cb_dev.setCurrentIndex(keys.index(want) if want in keys else 0)
+        self.cb_dev.blockSignals(False)
+
+    def on_dev_dir(self):
+        if any(n.startswith("event") for n in self.dev_watch.names()):
+            self.refresh_devices()
+
     def apply_cfg(self):
         self._loading = True
         idx = 0
@@ -177,8 +240,14 @@ class Main(QtWidgets.QMainWindow):
         self.sb_h.setValue(self.cfg["div_x"])
         self.sb_dead.setValue(self.cfg["deadzone"])
         self.sb_max.setValue(self.cfg["max_step"])
+        self.sb_pace.setValue(int(self.cfg["pace_hz"]))
+        self.sb_momentum.setValue(self.cfg["momentum"])
+        self.sb_momentum.setEnabled(self.cfg["pace_hz"] > 0)
         self.sb_hold.setValue(self.cfg["hold_grace"])
         self.sb_click.setValue(self.cfg["click_gap"])
+        self.chk_hires.setChecked(self.cfg["hires"])
+        self.chk_iso.setChecked(self.cfg["isolate"])
+        self.chk_adaptive.setChecked(self.cfg["adaptive"])
         remember_state = self.cfg.get("remember", True)
         self.chk_mem.blockSignals(True)
         self.chk_mem.setChecked(remember_state)
@@ -187,6 +256,9 @@ class Main(QtWidgets.QMainWindow):
         self.chk_auto.blockSignals(True)
         self.chk_auto.setChecked(self.autostart_cache)
         self.chk_auto.blockSignals(False)
+        self.chk_headless.blockSignals(True)
+        self.chk_headless.setChecked(self.cfg.get("autostart_headless", False))
+        self.chk_headless.blockSignals(False)
         self._sync_autostart_checkbox(initial=True)
         run_enabled = self.cfg.get("run_enabled", False) if remember_state else False
         self._loading = False
@@ -202,9 +274,16 @@ class Main(QtWidgets.QMainWindow):
             scroll_idle=float(self.sb_idle.value()),
             div_y=float(self.sb_v.value()), div_x=float(self.sb_h.value()),
             deadzone=float(self.sb_dead.value()), max_step=int(self.sb_max.value()),
+            pace_hz=float(self.sb_pace.value()), momentum=float(self.sb_momentum.value()),
+            adaptive=bool(self.chk_adaptive.isChecked()),
             hold_grace=float(self.sb_hold.value()),
             click_gap=float(self.sb_click.value()),
+            hires=bool(self.chk_hires.isChecked()),
+            devices=self.cfg.get("devices", []), merge_devices=self.cfg.get("merge_devices", True),
+            isolate=bool(self.chk_iso.isChecked()),
+            priority=self.cfg.get("priority", ""), cpus=self.cfg.get("cpus", []),
             remember=bool(self.chk_mem.isChecked()), autostart=bool(self.chk_auto.isChecked()),
+            autostart_headless=bool(self.chk_headless.isChecked()),
             run_enabled=bool(self.chk_run.isChecked())
         )
 
@@ -227,6 +306,7 @@ class Main(QtWidgets.QMainWindow):
             self.chk_auto.setChecked(False)
             self.chk_auto.setEnabled(False)
             self.chk_auto.blockSignals(False)
+        self.chk_headless.setEnabled(self.chk_auto.isChecked())
         if not initial:
             self.on_cfg_change()
 
@@ -242,32 +322,63 @@ class Main(QtWidgets.QMainWindow):
     def on_cfg_change(self, *a):
         if self._loading:
             return
-        self.cfg = self.collect_cfg(); save_cfg(self.cfg); self.update_tip()
+        old, self.cfg = self.cfg, self.collect_cfg()
+        self.sb_momentum.setEnabled(self.cfg["pace_hz"] > 0)
+        self.save_timer.start(); self.update_tip()  # one write once a spinbox drag settles
+        if not (self.remap and self.chk_run.isChecked()): return  # no status round trip per step
+        if any(old.get(k) != self.cfg[k] for k in ("device_name", "vendor", "product", "hires", "isolate")):
+            self.stop_remap(); self.start_remap()  # another device or capabilities: re-grab
+        else:
+            self.remap.update_params(**{k: self.cfg[k] for k in LIVE_PARAMS})
+
+    def flush_cfg(self):
+        if self.save_timer.isActive():
+            self.save_timer.stop(); save_cfg(self.cfg)
 
     def on_auto(self, on):
         if self.chk_mem.isChecked():
             self.autostart_cache = bool(on)
         self.cfg["autostart"]=bool(on); save_cfg(self.cfg)
-        try: set_autostart(bool(on))
+        self.chk_headless.setEnabled(bool(on))
+        try: set_autostart(bool(on), self.chk_headless.isChecked())
         except Exception as e: self.q_act.put(f"Autostart error: {e}")
 
+    def on_headless(self, on):
+        self.cfg["autostart_headless"] = bool(on)
+        self.on_auto(self.chk_auto.isChecked())
+
     def start_remap(self):
         if self.remap and self.remap.is_running(): return
         self.cfg = self.collect_cfg(); save_cfg(self.cfg)
         if not self.cfg["device_name"]:
             self.q_act.put("No device selected."); return
-        self.remap = RemapperScroll(
-            self.cfg["device_name"], self.cfg["vendor"], self.cfg["product"],
-            self.cfg["scroll_idle"], self.cfg["div_y"], self.cfg["div_x"],
-            self.cfg["deadzone"], self.cfg["max_step"], self.cfg["hold_grace"], self.cfg["click_gap"],
-            on_recv=self.q_in.put, on_act=self.q_act.put
-        )
+        attach = arg_value("--attach")
+        self.remap = None
+        if not attach and self.cfg.get("autostart_headless") and HEADLESS_SOCKET and os.path.exists(HEADLESS_SOCKET):
+            # The login daemon owns the mouse; if it is gone, run our own.
+            try: self.remap = DaemonClient(HEADLESS_SOCKET, on_act=self.q_act.put)
+            except OSError: pass
+        if attach:
+            # A headless daemon owns the device; it reads the config we just saved.
+            try: self.remap = DaemonClient(attach, on_act=self.q_act.put)
+            except OSError as e:
+                self.q_act.put(f"Cannot attach to {attach}: {e}"); return
+        elif self.remap is None:
+            cls = RemapperProcess if self.cfg["isolate"] else RemapperScroll
+            self.remap = cls.from_config(
+                self.cfg, on_act=self.q_act.put, log_level=LOG_ALL if self._rendering() else LOG_OFF,
+                record_path=arg_value("--record")
+            )
+        self.tel_seq = 0
         self.remap.start()
         self.status.setText("Running");
         self.q_act.put(f"Starting: {self.cfg['device_name']}")
 
     def stop_remap(self):
-        if self.remap: self.remap.stop()
+        if self.remap:
+            self.remap.stop()
+            if isinstance(self.remap, DaemonClient): self.remap.close()  # start_remap connects afresh
+        self.state = {}
         self.status.setText("Stopped")
         self.update_tip()
 
@@ -285,30 +396,91 @@ class Main(QtWidgets.QMainWindow):
         self.cfg = self.collect_cfg(); save_cfg(self.cfg)
 
     def pump(self):
-        pushed = False
+        # One document update per log per tick, at most LOG_LINES_PER_TICK lines each.
+        lines_in, lines_out = [], []
+        tel = self.remap.telemetry if self.remap else None
+        if tel and tel.level != LOG_OFF:
+            recs, self.tel_seq, dropped = tel.read(self.tel_seq, LOG_LINES_PER_TICK)
+            for rec in recs:
+                is_in, msg = format_record(rec)
+                (lines_in if is_in else lines_out).append(msg)
+            if dropped:
+                self.dropped += dropped
+                self.lbl_dropped.setText(f"Dropped lines: {self.dropped}")
         while True:
-            try: msg = self.q_in.get_nowait()
+            try: lines_out.append(self.q_act.get_nowait())
             except queue.Empty: break
-            self.log_in.appendPlainText(msg); pushed = True
-        while True:
-            try: msg = self.q_act.get_nowait()
-            except queue.Empty: break
-            self.log_out.appendPlainText(msg); pushed = True
-        if pushed: self.update_tip()
+        if lines_in: self.log_in.appendPlainText("\n".join(lines_in))
+        if lines_out: self.log_out.appendPlainText("\n".join(lines_out))
+
+    def _rendering(self):
+        return self.isVisible() and not self.isMinimized()
+
+    def _sync_visibility(self):
+        # Hidden or minimized: stop recording per-event telemetry and poll slowly.
+        on = self._rendering()
+        self.timer.setInterval(PUMP_MS if on else PUMP_HIDDEN_MS)
+        if self.remap:
+            tel = self.remap.telemetry
+            if on and tel.level == LOG_OFF: self.tel_seq = tel.head
+            tel.level = LOG_ALL if on else LOG_OFF
+
+    def showEvent(self, e):
+        super().showEvent(e); self._sync_visibility()
+
+    def hideEvent(self, e):
+        super().hideEvent(e); self._sync_visibility()
+
+    def changeEvent(self, e):
+        super().changeEvent(e)
+        if e.type() == QtCore.QEvent.WindowStateChange: self._sync_visibility()
 
     def update_tip(self):
+        lat = self.state.get("latency", [])
         self.tray.setToolTip(
             f"{self.cfg.get('device_name','')} | idle={self.cfg.get('scroll_idle',0):.2f}s "
             f"v={self.cfg.get('div_y',0):.0f} h={self.cfg.get('div_x',0):.0f} "
             f"hold={self.cfg.get('hold_grace',0):.2f}s click={self.cfg.get('click_gap',0):.3f}s"
+            + "".join("\n" + line for line in lat)
         )
 
+    def update_latency(self):
+        # One status() per tick feeds the latency line, learned windows and tooltip;
+        # in process/--attach mode each call is a blocking round trip.
+        self.state = self.remap.status() if self.remap else {}
+        if not self.state.get("running"): return
+        self.lbl_latency.setText(" · ".join(self.state.get("latency", [])))
+        self.update_learned()
+        self.update_tip()
+
+    def update_learned(self):
+        if not self.cfg.get("adaptive"):
+            self.lbl_learned.setText(""); return
+        lines = []
+        for c in self.state.get("calibration", []):
+            if c["ticks"] < CALIBRATE_MIN and c["onsets"] < CALIBRATE_MIN:
+                text = f"learning ({c['ticks']} ticks, {c['onsets']} starts)"
+            else:
+                text = (f"hold {c['hold_grace']*1000:.0f} ms, click {c['click_gap']*1000:.0f} ms "
+                        f"(tick every {c['period']*1000:.1f} ms, first gap {c['onset']*1000:.1f} ms)")
+            lines.append(f"{os.path.basename(c['device'])}: {text}")
+        self.lbl_learned.setText("\n".join(lines))
+
+    def dump_latency(self, path):
+        if not self.remap: return
+        text = json.dumps(self.remap.latency.dump(), indent=2)
+        if path == "-": print(text)
+        else: Path(path).write_text(text)
+
     def toggle_visible(self): self.setVisible(not self.isVisible())
     def closeEvent(self, e): self.hide(); e.ignore()
 
 def main():
     app = QtWidgets.QApplication(sys.argv)
     win = Main(); win.show()
+    app.aboutToQuit.connect(win.flush_cfg)
+    dump = arg_value("--dump-latency")
+    if dump: app.aboutToQuit.connect(lambda: win.dump_latency(dump))
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+# mouse_remapper_bench.py
+import os, sys, gc, json, time, fcntl, select, itertools, shutil, struct, termios, platform, argparse, tempfile, threading, subprocess, tracemalloc
+from array import array
+from evdev import ecodes as E
+import mouse_remapper_core as core
+from mouse_remapper_replay import replay, CaptureSink
+
+_EV = struct.Struct("llHHi")
+
+class FakeInfo:
+    def __init__(self, vendor=0x0458, product=0x0189, bustype=0x03):
+        self.vendor, self.product, self.bustype = vendor, product, bustype
+
+class FakeInputDevice:
+    # InputDevice stand-in: a pipe carrying real struct input_event records,
+    # so select/epoll and raw reads behave like an evdev node.
+    def __init__(self, path="/dev/input/fake0", name="Genius Wireless Mouse", info=None, fd=None):
+        self.path, self.name, self.info = path, name, info or FakeInfo()
+        if fd is None:
+            self.fd, self.wfd = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+            os.set_blocking(self.wfd, True)
+        else:
+            self.fd, self.wfd = fd, -1  # read end of a pipe fed by another process
+        self.mono = fd is None  # inject() stamps CLOCK_MONOTONIC, like a node after EVIOCSCLOCKID
+        self.injected = 0
+
+    def capabilities(self):
+        return {E.EV_KEY: [E.BTN_LEFT, E.BTN_RIGHT, E.BTN_MIDDLE],
+                E.EV_REL: [E.REL_X, E.REL_Y, E.REL_WHEEL, E.REL_WHEEL_HI_RES]}
+
+    def grab(self): pass
+    def ungrab(self): pass
+    def active_keys(self): return []
+
+    @property
+    def consumed(self):
+        # Records the loop has taken off the pipe (it reads the fd directly).
+        if self.fd < 0: return self.injected
+        queued = array("i", [0])
+        fcntl.ioctl(self.fd, termios.FIONREAD, queued)
+        return self.injected - queued[0] // _EV.size
+
+    def inject(self, events):
+        # events: iterable of (ts, type, code, value)
+        buf = b"".join(_EV.pack(int(ts), int(ts % 1 * 1e6), t, c, v) for ts, t, c, v in events)
+        os.write(self.wfd, buf)
+        self.injected += len(buf) // _EV.size
+
+    def close(self):
+        if self.fd >= 0: self.injected = self.consumed  # unread records are gone with the pipe
+        for fd in (self.fd, self.wfd):
+            if fd >= 0: os.close(fd)
+        self.fd = self.wfd = -1
+
+def make_sysfs(root, nodes):
+    # Fake /sys/class/input: nodes = [(eventN, name, vendor, product, rel_bits)].
+    for ev, name, vendor, product, rel in nodes:
+        dev = os.path.join(root, ev, "device")
+        os.makedirs(os.path.join(dev, "id")); os.makedirs(os.path.join(dev, "capabilities"))
+        for rel_path, text in (("name", name), ("id/vendor", f"{vendor:04x}"), ("id/product", f"{product:04x}"),
+                               ("id/bustype", "0003"), ("capabilities/rel", f"{rel:x}")):
+            with open(os.path.join(dev, rel_path), "w") as f: f.write(text + "\n")
+
+class FakeUInput:
+    # UInput stand-in; emitted bytes go to /dev/null (or `fd`) through a real write().
+    def __init__(self, *a, fd=None, **kw):
+        self.fd = os.open(os.devnull, os.O_WRONLY | os.O_CLOEXEC) if fd is None else fd
+    def close(self): os.close(self.fd)
+
+class PollCounter:
+    # Counts the loop's wake-ups: every return from epoll.poll(), with or without events.
+    def __init__(self):
+        self.polls = 0
+        self._epoll = select.epoll
+
+    def __enter__(self):
+        counter, real = self, self._epoll
+        class Counted:
+            def __init__(self): self.ep = real()
+            def __getattr__(self, name): return getattr(self.ep, name)
+            def poll(self, *a):
+                ready = self.ep.poll(*a)
+                counter.polls += 1
+                return ready
+        select.epoll = Counted
+        return self
+
+    def __exit__(self, *exc):
+        select.epoll = self._epoll
+
+class FireTimes:
+    # Wall-clock lateness of the machines' timed decisions: expire() calls
+    # emit_mmb/end_scroll with the deadline they fire for.
+    def __enter__(self):
+        self.late = {"click_gap": [], "hold_grace": [], "scroll_idle": []}
+        self.saved = emit, end = core.ScrollMachine.emit_mmb, core.ScrollMachine.end_scroll
+        late = self.late
+        def emit_mmb(m, ts):
+            late["click_gap"].append(time.monotonic() - ts)
+            emit(m, ts)
+        def end_scroll(m, reason, ts):
+            if m.scrolling and reason != core.STOP_MMB:
+                late["hold_grace" if reason == core.STOP_RELEASE else "scroll_idle"].append(time.monotonic() - ts)
+            end(m, reason, ts)
+        core.ScrollMachine.emit_mmb, core.ScrollMachine.end_scroll = emit_mmb, end_scroll
+        return self
+
+    def __exit__(self, *exc):
+        core.ScrollMachine.emit_mmb, core.ScrollMachine.end_scroll = self.saved
+
+class WriteCounter:
+    # Counts write() syscalls and SYN_REPORTs sent to one fd.
+    def __init__(self, fd):
+        self.fd, self.calls, self.frames = fd, 0, 0
+        self._write = os.write
+
+    def __enter__(self):
+        def counting(fd, data):
+            if fd == self.fd:
+                self.calls += 1
+                self.frames += sum(1 for r in _EV.iter_unpack(data) if r[2] == E.EV_SYN and r[3] == E.SYN_REPORT)
+            return self._write(fd, data)
+        os.write = counting
+        return self
+
+    def __exit__(self, *exc):
+        os.write = self._write
+
+# -- synthetic input streams: lists of (ts, type, code, value) ---------------
+
+T0 = 1000.0  # monotonic clocks never start near zero
+
+def frame(ts, *evs):
+    return [(ts, t, c, v) for t, c, v in evs] + [(ts, E.EV_SYN, E.SYN_REPORT, 0)]
+
+def stream_motion(n, hz=1000):
+    out = []
+    for i in range(n):
+        out += frame(T0 + i / hz, (E.EV_REL, E.REL_X, 1 + i % 3), (E.EV_REL, E.REL_Y, -(i % 2)))
+    return out
+
+def stream_scroll(n, hz=1000, tick_ms=8):
+    # Held touch surface: a wheel tick every tick_ms with vertical motion every frame.
+    out = []
+    for i in range(n):
+        evs = [(E.EV_REL, E.REL_Y, 3)]
+        if i % tick_ms == 0: evs.append((E.EV_REL, E.REL_WHEEL, 1))
+        out += frame(T0 + i / hz, *evs)
+    return out
+
+def stream_mmb(n, gap=0.2):
+    out = []
+    for i in range(n):
+        out += frame(T0 + i * gap, (E.EV_REL, E.REL_WHEEL, 1))
+    return out
+
+def stream_irregular(n, seed=1):
+    # Held surface at the jittery report timing of a cheap 2.4 GHz receiver:
+    # 4-14 ms between frames, uneven motion, lifted for 0.5 s every 200 frames.
+    import random
+    rnd, out, ts = random.Random(seed), [], T0
+    for i in range(n):
+        out += frame(ts, (E.EV_REL, E.REL_Y, rnd.randint(1, 9)), (E.EV_REL, E.REL_WHEEL, 1))
+        ts += rnd.uniform(0.004, 0.014) + (0.5 if i % 200 == 199 else 0.0)
+    return out
+
+def stream_gestures(n, seed=2):
+    # n gestures: every third a lone tap, the rest held scrolls of ~0.3 s with
+    # 6-10 ms between ticks and a 8-35 ms gap between the first two.
+    import random
+    rnd, out, ts, taps = random.Random(seed), [], T0, 0
+    for g in range(n):
+        out += frame(ts, (E.EV_REL, E.REL_WHEEL, 1))
+        if g % 3 == 2:
+            taps += 1
+        else:
+            ts += rnd.uniform(0.008, 0.035)
+            end = ts + 0.3
+            while ts < end:
+                out += frame(ts, (E.EV_REL, E.REL_Y, rnd.randint(1, 6)), (E.EV_REL, E.REL_WHEEL, 1))
+                ts += rnd.uniform(0.006, 0.010)
+        ts += 0.4
+    return out, taps
+
+STREAMS = {"motion": stream_motion, "scroll": stream_scroll, "mmb": stream_mmb}
+PARAMS = dict(scroll_idle=0.15, div_y=10.0, div_x=8.0, deadzone=0.0, max_step=1,
+              hold_grace=0.04, click_gap=0.02)
+
+def percentiles(samples, ps=(50, 90, 99, 99.9)):
+    s = sorted(samples)
+    return {f"p{p:g}": s[min(len(s) - 1, int(len(s) * p / 100))] for p in ps} | {"max": s[-1]}
+
+def bench_machine(events, **params):
+    # Per-event cost of the state machine with its real FrameWriter output.
+    ui = FakeUInput()
+    r = core.RemapperScroll("", 0, 0, log_level=core.LOG_OFF, **{**PARAMS, **params})
+    m = r.make_machine(core.FrameWriter(ui))
+    clock = time.perf_counter_ns
+    samples = array("q", bytes(8 * len(events)))  # preallocated: timing must not allocate
+    gc.collect(); gc.disable()
+    try:
+        blocks0 = sys.getallocatedblocks()
+        with WriteCounter(ui.fd) as wc:
+            t0 = clock()
+            for i, (ts, t, c, v) in enumerate(events):
+                s = clock()
+                m.advance(ts); m.feed(t, c, v, ts)
+                samples[i] = clock() - s
+            m.advance(float("inf"))
+            total = clock() - t0
+        blocks = sys.getallocatedblocks() - blocks0
+        head = events[:20000]
+        m2 = r.make_machine(core.FrameWriter(ui))
+        tracemalloc.start()
+        for ts, t, c, v in head:
+            m2.advance(ts); m2.feed(t, c, v, ts)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        gc.enable(); ui.close()
+    n = len(events)
+    return dict(
+        events=n, events_per_s=n / (total / 1e9),
+        ns_per_event=percentiles(samples),
+        retained_blocks_per_event=blocks / n,
+        transient_peak_bytes=peak,
+        output_frames=wc.frames, write_calls=wc.calls,
+        syscalls_per_frame=wc.calls / wc.frames if wc.frames else 0.0,
+    )
+
+class fake_input_tree:
+    # Points the core's sysfs/devnode lookups at a temp tree whose nodes open
+    # as the given fake devices; counts every InputDevice open.
+    def __init__(self, devices, extra=0):
+        self.devices, self.extra, self.opens = devices, extra, 0
+
+    def __enter__(self):
+        self.tmp = tempfile.mkdtemp(prefix="remapper-bench-")
+        sysfs, devdir = os.path.join(self.tmp, "sys"), os.path.join(self.tmp, "dev")
+        os.makedirs(devdir)
+        nodes, by_path = [], {}
+        for i, d in enumerate(self.devices):
+            d.path = os.path.join(devdir, f"event{i}")
+            by_path[d.path] = d
+            nodes.append((f"event{i}", d.name, d.info.vendor, d.info.product, 0x103))
+        for i in range(len(self.devices), len(self.devices) + self.extra):
+            # keyboards, sensors, other pointers: what a busy machine lists
+            nodes.append((f"event{i}", f"Other device {i}", 0x1000 + i, i, 0x103 if i % 5 == 0 else 0))
+        make_sysfs(sysfs, nodes)
+        def open_device(path):
+            self.opens += 1
+            if path not in by_path: raise OSError(2, "no such device", path)
+            return by_path[path]
+        self.saved = core.SYSFS_INPUT, core.DEV_DIR, core.InputDevice, core.use_monotonic_clock
+        core.SYSFS_INPUT, core.DEV_DIR, core.InputDevice = sysfs, devdir, open_device
+        core.use_monotonic_clock = lambda d: d.mono  # a pipe takes no EVIOCSCLOCKID
+        core._sysfs_cache.clear()
+        return self
+
+    def __exit__(self, *exc):
+        core.SYSFS_INPUT, core.DEV_DIR, core.InputDevice, core.use_monotonic_clock = self.saved
+        core._sysfs_cache.clear()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+class live_remapper:
+    # A RemapperScroll started over fake_input_tree(devices), emitting into
+    # FakeUInputs (all onto `out_fd` if given). Entering waits until the loop
+    # has created `outputs` virtual devices and returns (remapper, uinputs).
+    def __init__(self, devices, outputs=1, out_fd=None, cfg=None, **params):
+        self.devices, self.outputs, self.out_fd, self.cfg, self.params = devices, outputs, out_fd, cfg, params
+        self.r = None
+
+    def __enter__(self):
+        self.uis = uis = []
+        self.saved = core.UInput
+        core.UInput = lambda *a, **kw: uis.append(FakeUInput(fd=self.out_fd)) or uis[-1]
+        self.tree = fake_input_tree(self.devices).__enter__()
+        try:
+            d = self.devices[0]
+            self.r = (core.RemapperScroll.from_config(self.cfg, log_level=core.LOG_OFF) if self.cfg else
+                      core.RemapperScroll(d.name, d.info.vendor, d.info.product, log_level=core.LOG_OFF, **self.params))
+            self.r.start()
+            end = time.monotonic() + 2.0
+            while len(uis) < self.outputs and time.monotonic() < end: time.sleep(0.001)
+        except BaseException:
+            self.__exit__(None, None, None); raise
+        return self.r, uis
+
+    def __exit__(self, *exc):
+        if self.r: self.r.stop()
+        self.tree.__exit__(None, None, None)
+        core.UInput = self.saved
+
+def bench_loop(events, timeout=30.0, **params):
+    # End-to-end through RemapperScroll._run: epoll, fake device reads, output writes.
+    dev = FakeInputDevice()
+    try:
+        with live_remapper([dev], **{**PARAMS, **params}) as (r, uis):
+            now = time.monotonic()
+            # Re-stamp onto the live clock so deadlines fall where the stream puts them.
+            events = [(now + ts - T0, t, c, v) for ts, t, c, v in events]
+            with WriteCounter(uis[0].fd) as wc:
+                t0 = time.perf_counter()
+                def feed():
+                    for i in range(0, len(events), 512): dev.inject(events[i:i + 512])
+                feeder = threading.Thread(target=feed)
+                feeder.start()
+                end = time.monotonic() + timeout
+                while dev.consumed < len(events) and time.monotonic() < end: time.sleep(0.0005)
+                dt = time.perf_counter() - t0
+                feeder.join()
+            r.stop()
+        return dict(events=dev.consumed, events_per_s=dev.consumed / dt,
+                    output_frames=wc.frames, write_calls=wc.calls,
+                    syscalls_per_frame=wc.calls / wc.frames if wc.frames else 0.0)
+    finally:
+        dev.close()
+
+def bench_deadlines(rounds=10, idle=0.5):
+    # How late the live loop acts on each timed decision, measured from the
+    # deadline the event timestamps set, and how often it wakes while there
+    # is nothing to do (before any input and after every deadline has fired).
+    taps = (0.0,)
+    hold = (0.0, 0.005, 0.010)  # the second tick cancels the MMB
+    cases = (("click_gap", {}, taps), ("hold_grace", {}, hold),
+             ("scroll_idle", dict(hold_grace=0.25), hold))  # held longer than scroll_idle
+    out = {}
+    for name, params, offsets in cases:
+        p = {**PARAMS, **params}
+        settle = offsets[-1] + max(p["click_gap"], min(p["hold_grace"], p["scroll_idle"])) + 0.05
+        dev = FakeInputDevice()
+        try:
+            with PollCounter() as pc, FireTimes() as ft, live_remapper([dev], **p) as (r, _):
+                time.sleep(0.05)
+                p0 = pc.polls; time.sleep(idle); before = pc.polls - p0
+                for _ in range(rounds):
+                    t0 = time.monotonic()
+                    for dt in offsets:
+                        wait = t0 + dt - time.monotonic()
+                        if wait > 0: time.sleep(wait)
+                        dev.inject(frame(time.monotonic(), (E.EV_REL, E.REL_WHEEL, 1)))
+                    time.sleep(settle)
+                p0 = pc.polls; time.sleep(idle); after = pc.polls - p0
+                r.stop()
+            late = [s * 1e6 for s in ft.late[name]]
+            out[name] = dict(fired=len(late), fire_late_us=percentiles(late) if late else {},
+                             idle_wakeups_per_s=(before + after) / (2 * idle))
+        finally:
+            dev.close()
+    return out
+
+def bench_backlog(rounds=10, late=0.05):
+    # A wake-up `late` seconds behind a burst longer than one read: a tap, then
+    # motion, then the tick 12 ms later that makes it a hold, all queued at
+    # once. Every queued record must be taken in before deadlines expire, or
+    # the tap fires an MMB that replaying the same stream doesn't.
+    burst = frame(0.0, (E.EV_REL, E.REL_WHEEL, 1))
+    for i in range(23): burst += frame(0.0005 * (i + 1), (E.EV_REL, E.REL_X, 1), (E.EV_REL, E.REL_Y, 1))
+    burst += frame(0.012, (E.EV_REL, E.REL_WHEEL, 1))
+    mmb = lambda data: sum(1 for r in _EV.iter_unpack(data) if r[2:] == (E.EV_KEY, E.BTN_MIDDLE, 1))
+    recs = b"".join(core.CAPTURE_REC.pack(T0 + k * 0.5 + ts, t, c, v, 0) for k in range(rounds) for ts, t, c, v in burst)
+    expected = sum(1 for _, evs in replay(recs, PARAMS) if (E.EV_KEY, E.BTN_MIDDLE, 1) in evs)
+    dev = FakeInputDevice()
+    out_r, out_w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+    live, got = live_remapper([dev], out_fd=out_w, **PARAMS), 0
+    try:
+        with live as (r, uis):
+            for _ in range(rounds):
+                now = time.monotonic()
+                dev.inject([(now - late + ts, t, c, v) for ts, t, c, v in burst])  # one write, one wake-up
+                time.sleep(PARAMS["hold_grace"] + PARAMS["click_gap"] + 0.05)
+                try:
+                    while True: got += mmb(os.read(out_r, 65536))
+                except BlockingIOError: pass
+    finally:
+        dev.close()
+        os.close(out_r)
+        if not live.uis: os.close(out_w)  # otherwise it went with the FakeUInput
+    return dict(queued_records=len(burst), read_records=core.READ_EVENTS, rounds=rounds,
+                replay_mmb=expected, live_mmb=got, phantom_mmb=max(0, got - expected))
+
+def bench_sources(frames, counts=(1, 2, 4, 8, 16, 32), merge=True, batch=1):
+    # One loop multiplexing N fake mice (each its own profile and machine),
+    # `frames` motion frames in total, fed round-robin `batch` frames per
+    # write - one frame per read is what a 1 kHz mouse delivers.
+    out = {}
+    for n in counts:
+        devs = [FakeInputDevice(name=f"Bench Mouse {i}", info=FakeInfo(product=0x0189 + i)) for i in range(n)]
+        profiles = [dict(device_name=d.name, vendor=d.info.vendor, product=d.info.product,
+                         div_y=PARAMS["div_y"] + i) for i, d in enumerate(devs[1:])]
+        try:
+            with live_remapper(devs, 1 if merge else n, profiles=profiles, merge=merge, **PARAMS) as (r, uis):
+                now = time.monotonic()
+                per = stream_motion(max(1, frames // n))
+                per = [(now + ts - T0, t, c, v) for ts, t, c, v in per]
+                total = len(per) * n
+                chunk = batch * 3  # motion frames are 3 events
+                t0 = time.perf_counter()
+                def feed():
+                    for i in range(0, len(per), chunk):
+                        for d in devs: d.inject(per[i:i + chunk])
+                clk = time.pthread_getcpuclockid(r._thr.ident)  # the loop's own CPU time
+                c0 = time.clock_gettime(clk)
+                feeder = threading.Thread(target=feed)
+                feeder.start()
+                end = time.monotonic() + 30.0
+                while sum(d.consumed for d in devs) < total and time.monotonic() < end: time.sleep(0.0005)
+                dt = time.perf_counter() - t0
+                cpu = time.clock_gettime(clk) - c0
+                feeder.join()
+            got = sum(d.consumed for d in devs)
+            out[str(n)] = dict(events=got, events_per_s=got / dt, loop_cpu_ns_per_event=cpu * 1e9 / got,
+                               virtual_devices=len(uis))
+        finally:
+            for d in devs: d.close()
+    base = out[str(counts[0])]["loop_cpu_ns_per_event"]
+    for v in out.values(): v["overhead_vs_1"] = v["loop_cpu_ns_per_event"] / base
+    return out
+
+def probe(in_w, out_r, frames, hz):
+    # Own process, so it is not slowed by the load being measured: paces
+    # one-motion-event frames into the fake device and stamps each output
+    # frame's arrival. Pass-through is 1:1, so the i-th SYN answers frame i.
+    sent, got = array("d", bytes(8 * frames)), array("d", bytes(8 * frames))
+    def reader():
+        n, buf = 0, b""
+        while n < frames:
+            data = os.read(out_r, 65536)
+            if not data: return
+            t = time.monotonic()
+            buf += data
+            k = len(buf) - len(buf) % _EV.size
+            for r in _EV.iter_unpack(buf[:k]):
+                if r[2] == E.EV_SYN and n < frames: got[n] = t; n += 1
+            buf = buf[k:]
+    th = threading.Thread(target=reader, daemon=True)
+    th.start()
+    frame = _EV.pack(0, 0, E.EV_REL, E.REL_X, 1) + _EV.pack(0, 0, E.EV_SYN, E.SYN_REPORT, 0)
+    t0 = time.monotonic()
+    for i in range(frames):
+        dt = t0 + i / hz - time.monotonic()
+        if dt > 0: time.sleep(dt)
+        sent[i] = time.monotonic()
+        os.write(in_w, frame)
+    th.join(timeout=5.0)
+    lat = [(g - s) * 1e6 for s, g in zip(sent, got) if g]
+    res = dict(frames=frames, received=len(lat))
+    if lat:
+        res.update(latency_us=percentiles(lat))
+        res["jitter_us"] = res["latency_us"]["p99"] - res["latency_us"]["p50"]
+    print(json.dumps(res))
+    return 0
+
+def core_child(in_fd, out_fd, argv):
+    # RemapperProcess child with the fakes standing in for /dev/input and /dev/uinput.
+    dev = FakeInputDevice(fd=in_fd)
+    core.UInput = lambda *a, **kw: FakeUInput(fd=out_fd)
+    with fake_input_tree([dev]):
+        return core.main(argv)
+
+class BenchProcess(core.RemapperProcess):
+    def __init__(self, cfg, in_fd, out_fd, **kw):
+        super().__init__(cfg, log_level=core.LOG_OFF, **kw)
+        self.in_fd, self.out_fd = in_fd, out_fd
+        self.pass_fds = (in_fd, out_fd)
+
+    def command(self, ctl_fd):
+        return [sys.executable, os.path.abspath(__file__), "--core-child", str(self.in_fd), str(self.out_fd),
+                *super().command(ctl_fd)[2:]]
+
+def gui_load(stop):
+    # What a busy Qt main thread does to the interpreter: pure-Python work
+    # holding the GIL (document appends, repaint bookkeeping, JSON).
+    while not stop.is_set():
+        json.dumps([{"ts": i * 0.001, "text": f"TICK code=8 val={i}"} for i in range(200)])
+
+def bench_isolation(frames=2000, hz=1000, priority=None):
+    # Input-to-output latency through the live loop with the remapper as a
+    # thread of this process vs. a RemapperProcess child, idle and under load.
+    from mouse_remapper_config import DEFAULTS
+    cfg = {**DEFAULTS, **PARAMS}
+    out = {}
+    for mode in ("thread", "process"):
+        for loaded in (False, True):
+            in_r, in_w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC); os.set_blocking(in_w, True)
+            out_r, out_w = os.pipe2(os.O_CLOEXEC)
+            stop = threading.Event()
+            loads = [threading.Thread(target=gui_load, args=(stop,), daemon=True)] if loaded else []
+            live, r = None, None
+            try:
+                if mode == "thread":
+                    dev = FakeInputDevice(fd=in_r); in_r = -1  # dev owns it now
+                    live = live_remapper([dev], out_fd=out_w, cfg=cfg)
+                    r, _ = live.__enter__()
+                else:
+                    r = BenchProcess(cfg, in_r, out_w, priority=priority)
+                    r.start()
+                end = time.monotonic() + 5.0
+                while not r.is_running() and time.monotonic() < end: time.sleep(0.01)
+                time.sleep(0.2)  # let the loop settle into epoll
+                for t in loads: t.start()
+                p = subprocess.run([sys.executable, os.path.abspath(__file__), "--probe",
+                                    str(in_w), str(out_r), str(frames), str(hz)],
+                                   pass_fds=(in_w, out_r), capture_output=True, text=True, timeout=60)
+                out[f"{mode}_{'loaded' if loaded else 'idle'}"] = json.loads(p.stdout or "{}")
+            finally:
+                stop.set()
+                for t in loads: t.join()
+                if live: live.__exit__(None, None, None)
+                elif r: r.stop()
+                for fd in (in_r, in_w, out_r):
+                    if fd >= 0: os.close(fd)
+                if mode == "thread": dev.close()
+                else: os.close(out_w)
+    return out
+
+def bench_gui(seconds=3.0, hz=1000):
+    # GUI-thread CPU of the app's log pump while a scroll burst fills the
+    # telemetry ring at `hz` ticks/s (a tick and a scroll record each), with
+    # the window shown and hidden. Offscreen Qt; the config is never touched.
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5 import QtWidgets, QtCore
+        import mouse_remapper_app as app
+    except ImportError as e:
+        return dict(skipped=str(e))
+    from mouse_remapper_config import DEFAULTS
+    qapp = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    saved = app.load_cfg, app.save_cfg
+    app.load_cfg, app.save_cfg = (lambda *a: dict(DEFAULTS)), (lambda *a: None)
+    out = {}
+    try:
+        for shown in (True, False):
+            win = app.Main()
+            win.remap = core.RemapperScroll("", 0, 0, log_level=core.LOG_ALL)
+            win.show()
+            if not shown: win.hide()
+            qapp.processEvents()
+            tel, stop = win.remap.telemetry, threading.Event()
+            def produce():
+                t0 = time.monotonic()
+                for i in itertools.count():
+                    if stop.is_set(): return
+                    ts = t0 + i / hz
+                    dt = ts - time.monotonic()
+                    if dt > 0.001: time.sleep(dt)  # ~1 ms granularity: bursts of a few ticks
+                    if tel.level >= core.LOG_ALL:
+                        tel.put(ts, core.T_TICK, E.REL_WHEEL, 1)
+                        tel.put(ts, core.T_SCROLL, E.REL_WHEEL_HI_RES, -12, 1)
+            th = threading.Thread(target=produce, daemon=True)
+            QtCore.QTimer.singleShot(int(seconds * 1000), qapp.quit)
+            c0, t0 = time.thread_time(), time.monotonic()
+            th.start()
+            qapp.exec_()
+            cpu, wall = time.thread_time() - c0, time.monotonic() - t0
+            stop.set(); th.join()
+            out["shown" if shown else "hidden"] = dict(
+                gui_cpu_ms_per_s=cpu * 1e3 / wall, records=tel.head,
+                rendered_lines=win.tel_seq - win.dropped, dropped_lines=win.dropped)
+            win.remap = None
+            win.hide(); win.tray.hide(); win.deleteLater()
+            qapp.processEvents()
+    finally:
+        app.load_cfg, app.save_cfg = saved
+    return out
+
+def bench_pacing(events, variants=((0, 0), (120, 0), (144, 0), (120, 0.25))):
+    # Output cadence of the same irregular input, emitted with the input vs.
+    # paced at a fixed rate (and with momentum after lift-off).
+    recs = b"".join(core.CAPTURE_REC.pack(*e, 0) for e in events)
+    end = events[-1][0]
+    out = {}
+    for hz, tau in variants:
+        frames = replay(recs, dict(PARAMS, hires=True, pace_hz=hz, momentum=tau))
+        ts = [t for t, evs in frames if any(c == E.REL_WHEEL_HI_RES for _, c, _ in evs)]
+        gaps = [b - a for a, b in zip(ts, ts[1:]) if b - a < 0.1]  # within a gesture
+        mean = sum(gaps) / len(gaps) if gaps else 0.0
+        sd = (sum((g - mean) ** 2 for g in gaps) / len(gaps)) ** 0.5 if gaps else 0.0
+        units = sum(-v for _, evs in frames for _, c, v in evs if c == E.REL_WHEEL_HI_RES)
+        out[f"{hz:g}hz" + (f"_momentum{tau:g}" if tau else "")] = dict(
+            scroll_frames=len(ts), interval_ms=mean * 1e3, interval_cv=sd / mean if mean else 0.0,
+            hires_units=units, tail_ms=max(0.0, (ts[-1] - end) * 1e3) if ts else 0.0)
+    return out
+
+def bench_calibration(gestures=300):
+    # Fixed default windows vs. windows learned from the ticks themselves.
+    events, taps = stream_gestures(gestures)
+    recs = b"".join(core.CAPTURE_REC.pack(*e, 0) for e in events)
+    held = gestures - taps
+    out = {}
+    for name, adaptive in (("fixed", False), ("adaptive", True)):
+        sink = CaptureSink()
+        frames = replay(recs, dict(PARAMS, adaptive=adaptive), sink=sink)
+        mmb = sum(1 for _, evs in frames if (E.EV_KEY, E.BTN_MIDDLE, 1) in evs)
+        rel = sorted(s for cat, s in sink.marks if cat == core.LAT_RELEASE)
+        out[name] = dict(phantom_mmb=max(0, mmb - taps), missed_mmb=max(0, taps - mmb),
+                         cutouts=max(0, len(rel) - held),
+                         release_ms=percentiles([s * 1e3 for s in rel]) if rel else {})
+    m = core.RemapperScroll("", 0, 0, log_level=core.LOG_OFF, **dict(PARAMS, adaptive=True)).make_machine(CaptureSink())
+    for ts, t, c, v in events: m.advance(ts); m.feed(t, c, v, ts)
+    out["learned"] = dict(hold_grace_ms=m.hold_grace * 1e3, click_gap_ms=m.click_gap * 1e3,
+                          period_ms=m.period.mean * 1e3, onset_ms=m.onset.mean * 1e3)
+    return out
+
+def bench_discovery(nodes=500):
+    # Startup cost of listing candidates and grabbing the configured mouse on a
+    # machine with many input nodes. Nothing but the chosen device may be opened.
+    dev = FakeInputDevice()
+    try:
+        with fake_input_tree([dev], extra=nodes - 1) as tree:
+            t = time.perf_counter(); cands = core.list_pointer_candidates(); cold = time.perf_counter() - t
+            t = time.perf_counter(); core.list_pointer_candidates(); warm = time.perf_counter() - t
+            list_opens = tree.opens
+            mgr = core.DeviceManager(dev.name, dev.info.vendor, dev.info.product)
+            t = time.perf_counter(); got = mgr.scan(); scan = time.perf_counter() - t
+            mgr.devices.clear()
+        return dict(nodes=nodes, candidates=len(cands), list_cold_ms=cold * 1e3, list_warm_ms=warm * 1e3,
+                    list_device_opens=list_opens, scan_ms=scan * 1e3, scan_device_opens=tree.opens - list_opens,
+                    grabbed=len(got))
+    finally:
+        dev.close()
+
+def run_all(n, only=None):
+    results = {}
+    for name, make in STREAMS.items():
+        if only and name not in only: continue
+        evs = make(n if name != "mmb" else max(1, n // 50))
+        results[name] = dict(machine=bench_machine(evs))
+        if name != "mmb":  # taps need real click_gap waits in the live loop
+            results[name]["loop"] = bench_loop(evs)
+    if not only or "pacing" in only:
+        results["pacing"] = dict(irregular=bench_pacing(stream_irregular(max(1, n // 10))),
+                                 khz=bench_pacing(stream_scroll(max(1, n // 5))))
+    if not only or "calibration" in only:
+        results["calibration"] = bench_calibration()
+    if not only or "deadlines" in only:
+        results["deadlines"] = bench_deadlines()
+    if not only or "backlog" in only:
+        results["backlog"] = bench_backlog()
+    if not only or "sources" in only:
+        results["sources"] = bench_sources(n)
+    if not only or "discovery" in only:
+        results["discovery"] = bench_discovery()
+    if not only or "isolation" in only:
+        results["isolation"] = bench_isolation()
+    if not only or "gui" in only:
+        results["gui"] = bench_gui()
+    return results
+
+# Lower is better for these keys; everything else (events_per_s) higher is better.
+_LOWER = ("p50", "p99", "syscalls_per_frame", "loop_cpu_ns_per_event", "retained_blocks_per_event", "idle_wakeups_per_s",
+          "phantom_mmb", "gui_cpu_ms_per_s", "list_cold_ms", "list_warm_ms", "list_device_opens", "scan_ms", "scan_device_opens")
+
+def compare(old, new, tolerance):
+    bad = []
+    def walk(a, b, path):
+        for k, v in b.items():
+            if k not in a: continue
+            if isinstance(v, dict): walk(a[k], v, path + [k]); continue
+            if not isinstance(v, (int, float)): continue  # a zero baseline still counts (phantom_mmb)
+            if k == "events_per_s" and v < a[k] * (1 - tolerance):
+                bad.append(f"{'/'.join(path + [k])}: {a[k]:.0f} -> {v:.0f}")
+            elif k in _LOWER and v > a[k] * (1 + tolerance) and v - a[k] > 1e-9:
+                bad.append(f"{'/'.join(path + [k])}: {a[k]:.3g} -> {v:.3g}")
+    walk(old.get("scenarios", {}), new["scenarios"], [])
+    return bad
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--probe"]: return probe(*map(int, argv[1:5]))
+    if argv[:1] == ["--core-child"]: return core_child(int(argv[1]), int(argv[2]), argv[3:])
+    ap = argparse.ArgumentParser(description="Benchmark the remapping core with fake InputDevice/UInput.")
+    ap.add_argument("-n", type=int, default=50000, help="frames per scenario")
+    ap.add_argument("--only", action="append", help="run only this scenario (repeatable)")
+    ap.add_argument("--out", help="write results as JSON")
+    ap.add_argument("--compare", help="JSON from an earlier run; exit 1 on regressions")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change (default 0.2)")
+    a = ap.parse_args(argv)
+
+    res = dict(python=platform.python_version(), machine=platform.machine(),
+               time=time.strftime("%Y-%m-%dT%H:%M:%S"), n=a.n, scenarios=run_all(a.n, a.only))
+    print(json.dumps(res, indent=2))
+    if a.out:
+        with open(a.out, "w") as f: json.dump(res, f, indent=2)
+    if a.compare:
+        bad = compare(json.load(open(a.compare)), res, a.tolerance)
+        for line in bad: print("REGRESSION " + line, file=sys.stderr)
+        return 1 if bad else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# mouse_remapper_config.py
+import os, json
+from pathlib import Path
+
+APP = "genius-remapper"
+CFG_DIR = Path.home()/".config"/APP
+CFG = CFG_DIR/"config.json"
+
+DEFAULTS = dict(
+    device_name="Genius Wireless Mouse", vendor=0x0458, product=0x0189,
+    scroll_idle=0.15, div_y=10.0, div_x=8.0,
+    deadzone=0.0, max_step=1, hold_grace=0.04, click_gap=0.02, hires=False,
+    pace_hz=0.0, momentum=0.0,  # 0 = emit with the input / no momentum
+    adaptive=False,  # learn hold_grace/click_gap from the device's tick timing
+    devices=[], merge_devices=True,  # further source mice, see README "Several mice"
+    isolate=False, priority="", cpus=[],  # RemapperProcess; priority "fifo:N" or "nice:N"
+    remember=True, autostart=False, run_enabled=False,
+    autostart_headless=False  # autostart runs `python -m mouse_remapper_core`, no window
+)
+
+def load_cfg(path=CFG):
+    try:
+        if path.exists():
+            stored = json.loads(path.read_text())
+            if "hold_grace" not in stored and "tick_grace" in stored:
+                stored["hold_grace"] = stored.get("tick_grace", DEFAULTS["hold_grace"])
+            if "click_gap" not in stored:
+                stored["click_gap"] = DEFAULTS["click_gap"]
+            if "run_enabled" not in stored:
+                stored["run_enabled"] = DEFAULTS["run_enabled"]
+            if stored.get("remember", True):
+                return {**DEFAULTS, **stored}
+            keep = {k: stored.get(k, DEFAULTS[k]) for k in ("remember", "autostart", "run_enabled")}
+            return {**DEFAULTS, **keep}
+    except Exception: pass
+    return dict(DEFAULTS)
+
+def save_cfg(c, path=CFG):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = dict(c)
+    if not payload.get("remember", True):
+        payload = {k: payload[k] for k in ("remember", "autostart", "run_enabled")}
+    # Write-to-temp and rename, so readers (and crashes) never see a torn file.
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(json.dumps(payload, indent=2))
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, path)
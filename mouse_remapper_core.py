@@ -1,27 +1,816 @@
 #!/usr/bin/env python3
 # mouse_remapper_core.py
-import time, select, threading, traceback
+import os, sys, json, math, mmap, time, errno, fcntl, ctypes, select, socket, struct, threading, traceback
+from array import array
+from collections import deque
 from evdev import InputDevice, UInput, ecodes as E, list_devices
 
+DEV_DIR = "/dev/input"
+SYSFS_INPUT = "/sys/class/input"
+_POINTER_BITS = (1 << E.REL_X) | (1 << E.REL_Y) | (1 << E.REL_WHEEL) | (1 << 11) | (1 << 12)
+_LONG_BITS = struct.calcsize("l") * 8
+_sysfs_cache = {}  # inputN sysfs dir -> (name, vendor, product, bustype) or None
+_sysfs_lock = threading.Lock()  # the GUI and the input thread both list nodes
+
+def is_pointer(d):
+    rel = d.capabilities().get(E.EV_REL, [])
+    return E.REL_X in rel or E.REL_Y in rel or E.REL_WHEEL in rel or 11 in rel or 12 in rel
+
+def _read(path):
+    with open(path) as f: return f.read().strip()
+
+def sysfs_node_info(node_dir):
+    # (name, vendor, product, bustype) of a pointer-capable eventN node, else None.
+    # Reads sysfs attributes only; the device itself is never opened.
+    try:
+        dev = os.path.join(node_dir, "device")
+        bits = 0
+        for word in _read(os.path.join(dev, "capabilities", "rel")).split():
+            bits = (bits << _LONG_BITS) | int(word, 16)
+        if not bits & _POINTER_BITS: return None
+        ident = os.path.join(dev, "id")
+        return (_read(os.path.join(dev, "name")), int(_read(os.path.join(ident, "vendor")), 16),
+                int(_read(os.path.join(ident, "product")), 16), int(_read(os.path.join(ident, "bustype")), 16))
+    except (OSError, ValueError):
+        return None
+
+def pointer_nodes(sysfs_root=None, dev_dir=None):
+    # -> {device path: (name, vendor, product, bustype)}, or None without sysfs.
+    # Attributes are cached per inputN registration, which changes on every
+    # hotplug; only the directory listing is re-read on each call.
+    sysfs_root, dev_dir = sysfs_root or SYSFS_INPUT, dev_dir or DEV_DIR
+    try: names = [n for n in os.listdir(sysfs_root) if n.startswith("event")]
+    except OSError: return None
+    out, seen = {}, set()
+    with _sysfs_lock:
+        for n in names:
+            node = os.path.join(sysfs_root, n)
+            try: key = os.readlink(os.path.join(node, "device"))  # .../inputN
+            except OSError: key = node
+            seen.add(key)
+            if key not in _sysfs_cache: _sysfs_cache[key] = sysfs_node_info(node)
+            if _sysfs_cache[key]: out[os.path.join(dev_dir, n)] = _sysfs_cache[key]
+        for key in set(_sysfs_cache) - seen: _sysfs_cache.pop(key, None)
+    return out
+
 def list_pointer_candidates():
-    seen = {}
+    nodes = pointer_nodes()
+    if nodes is not None:
+        return sorted({info[:3] for info in nodes.values()})
+    seen = {}  # no sysfs (containers): fall back to querying the nodes
     for path in list_devices():
         try:
             d = InputDevice(path)
-            rel = d.capabilities().get(E.EV_REL, [])
-            if E.REL_X in rel or E.REL_Y in rel or E.REL_WHEEL in rel or 11 in rel or 12 in rel:
-                seen[(d.name, d.info.vendor, d.info.product)] = True
+            try:
+                if is_pointer(d):
+                    seen[(d.name, d.info.vendor, d.info.product)] = True
+            finally:
+                d.close()
         except Exception:
             pass
     return sorted(seen.keys())
 
+IN_ATTRIB, IN_CREATE, IN_DELETE = 0x4, 0x100, 0x200
+IN_NONBLOCK, IN_CLOEXEC = os.O_NONBLOCK, os.O_CLOEXEC
+_INOTIFY_EV = struct.Struct("iIII")  # wd, mask, cookie, len
+
+class DirWatch:
+    # inotify on a directory through libc; reports names created or
+    # re-permissioned, and with `removed` also deleted ones.
+    def __init__(self, path, removed=False):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CREATE | IN_ATTRIB | (IN_DELETE if removed else 0)
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            err = ctypes.get_errno(); os.close(self.fd)
+            raise OSError(err, f"cannot watch {path}")
+
+    def names(self):
+        out = []
+        try: buf = os.read(self.fd, 4096)
+        except BlockingIOError: return out
+        i = 0
+        while i + _INOTIFY_EV.size <= len(buf):
+            _wd, _mask, _cookie, n = _INOTIFY_EV.unpack_from(buf, i)
+            i += _INOTIFY_EV.size
+            name = buf[i:i + n].split(b"\0", 1)[0].decode(errors="replace")
+            i += n
+            if name and name not in out: out.append(name)
+        return out
+
+    def close(self):
+        os.close(self.fd)
+
+class DeviceManager:
+    # Opens, grabs and re-grabs the event nodes matching (name, vendor, product)
+    # or one of the `extra` triples. Candidates are picked from sysfs, so only
+    # matching nodes are ever opened.
+    def __init__(self, name, vendor, product, dev_dir=None, sysfs_root=None, extra=()):
+        self.name, self.vendor, self.product = name, vendor, product
+        self.targets = [(name, vendor, product), *extra]
+        self.dev_dir, self.sysfs_root = dev_dir or DEV_DIR, sysfs_root or SYSFS_INPUT
+        self.devices = {}  # fd -> InputDevice
+        self.mono = {}     # fd -> events carry CLOCK_MONOTONIC timestamps
+        self.profile = {}  # fd -> index into targets
+        self.watch = None
+
+    def matches(self, info):
+        return info is not None and info[:3] in self.targets
+
+    def open(self, path, checked=False):
+        if any(d.path == path for d in self.devices.values()): return None
+        if not checked:
+            node = os.path.join(self.sysfs_root, os.path.basename(path))
+            if os.path.isdir(node) and not self.matches(sysfs_node_info(node)): return None
+        try: d = InputDevice(path)
+        except OSError: return None  # gone again, or udev hasn't fixed permissions yet
+        try:
+            key = (d.name, d.info.vendor, d.info.product)
+            if key in self.targets and is_pointer(d):
+                d.grab()
+                self.devices[d.fd] = d
+                self.mono[d.fd] = use_monotonic_clock(d)
+                self.profile[d.fd] = self.targets.index(key)
+                return d
+        except OSError:
+            pass
+        d.close()
+        return None
+
+    def scan(self):
+        nodes = pointer_nodes(self.sysfs_root, self.dev_dir)
+        if nodes is None:
+            return [d for d in (self.open(p) for p in list_devices(self.dev_dir)) if d]
+        return [d for d in (self.open(p, checked=True) for p, info in sorted(nodes.items())
+                            if self.matches(info)) if d]
+
+    def start_watch(self):
+        self.watch = DirWatch(self.dev_dir)
+        return self.watch.fd
+
+    def added(self):
+        # New matching nodes since the last call, already grabbed.
+        return [d for d in (self.open(os.path.join(self.dev_dir, n))
+                            for n in self.watch.names() if n.startswith("event")) if d]
+
+    def drop(self, d):
+        self.devices.pop(d.fd, None); self.mono.pop(d.fd, None); self.profile.pop(d.fd, None)
+        try: d.ungrab()
+        except OSError: pass
+        try: d.close()
+        except OSError: pass
+
+    def close(self):
+        for d in list(self.devices.values()): self.drop(d)
+        if self.watch: self.watch.close(); self.watch = None
+
+EVIOCSCLOCKID = 0x400445a0  # _IOW('E', 0xa0, int)
+PR_SET_PDEATHSIG = 1
+_EV = struct.Struct("llHHi")  # struct input_event
+_SYN = _EV.pack(0, 0, E.EV_SYN, E.SYN_REPORT, 0)
+READ_EVENTS = 64  # input_event records per read() of a grabbed node
+
+def use_monotonic_clock(d):
+    # Stamp events with CLOCK_MONOTONIC so ev.timestamp() compares with time.monotonic().
+    try:
+        fcntl.ioctl(d.fd, EVIOCSCLOCKID, struct.pack("i", time.CLOCK_MONOTONIC))
+        return True
+    except OSError:
+        return False
+
+CAPTURE_MAGIC = b"GRMCAP2\n"
+CAPTURE_REC = struct.Struct("<dHHiI")  # monotonic ts, type, code, value, source node
+CAPTURE_MAGIC_V1, CAPTURE_REC_V1 = b"GRMCAP1\n", struct.Struct("<dHHi")  # one node, no source field
+
+class Recorder:
+    # Raw capture of the grabbed input stream: a magic header followed by
+    # fixed-size records, so readers can mmap the file and iter_unpack it.
+    def __init__(self, path):
+        self.f = open(path, "wb")
+        self.f.write(CAPTURE_MAGIC)
+
+    def write(self, ts, etype, code, value, src=0):
+        self.f.write(CAPTURE_REC.pack(ts, etype, code, value, src))
+
+    def close(self):
+        self.f.close()
+
+class FrameWriter:
+    # Collects the translated events of one input frame and hands them to
+    # uinput together with their SYN_REPORT in a single write(). The frame's
+    # latency is measured from the source timestamp passed to note().
+    def __init__(self, ui, latency=None):
+        self.ui, self.fd = ui, ui.fd
+        self.buf = bytearray()
+        self.lat = latency
+        self.cat, self.src = -1, 0.0
+
+    def note(self, cat, src_ts):
+        if self.cat < 0: self.cat, self.src = cat, src_ts
+
+    def mark(self, cat, src_ts):
+        # Latency of a decision that emits nothing (scroll release).
+        if self.lat: self.lat.record(cat, time.monotonic() - src_ts)
+
+    def write(self, etype, code, value):
+        self.buf += _EV.pack(0, 0, etype, code, value)
+
+    def syn(self):
+        if self.buf:
+            self.buf += _SYN
+            os.write(self.fd, self.buf)
+            self.buf.clear()
+            if self.lat and self.cat >= 0: self.lat.record(self.cat, time.monotonic() - self.src)
+        self.cat = -1
+
+    def discard(self):
+        self.buf.clear()
+        self.cat = -1
+
+    def forward(self, data, srcs):
+        # Complete pass-through frames, SYNs included, in one write().
+        os.write(self.fd, data)
+        if self.lat:
+            t = time.monotonic()
+            for s in srcs: self.lat.record(LAT_MOTION, t - s)
+
+class RawFeed:
+    # Bulk reader for one grabbed node. Records are decoded straight from a
+    # preallocated buffer; pure pointer-motion frames that arrive while the
+    # machine has nothing pending are copied through as they are, all of one
+    # read in a single write. Everything else goes through ScrollMachine.
+    def __init__(self, fd, machine, kernel_ts, rec=None, src=0, n=READ_EVENTS):
+        self.fd, self.m, self.kts, self.rec, self.src = fd, machine, kernel_ts, rec, src
+        self.buf = bytearray(n * _EV.size)
+        self.view = memoryview(self.buf)
+        self.out, self.srcs = bytearray(), []
+        self.held = []  # records of a frame that a read cut in two
+
+    def read(self, now):
+        # Drain the node: records left queued past a full buffer would let the
+        # caller expire a deadline that one of them cancels.
+        n = os.readv(self.fd, (self.buf,))
+        while True:
+            self.decode(n, now)
+            if n < len(self.buf): break
+            try: n = os.readv(self.fd, (self.buf,))
+            except BlockingIOError: break
+        if self.out: self.flush()
+
+    def decode(self, n, now):
+        m, rec, kts, view, size, src = self.m, self.rec, self.kts, self.view, _EV.size, self.src
+        SYN, REL, X, Y = E.EV_SYN, E.EV_REL, E.REL_X, E.REL_Y
+        plain, start, end = not self.held, 0, 0
+        for sec, usec, t, c, v in _EV.iter_unpack(view[:n]):
+            end += size
+            if rec: rec.write(sec + usec / 1000000.0 if kts else now, t, c, v, src)
+            if t == SYN and c == E.SYN_REPORT:
+                if plain and not (m.scrolling or m.pending_mmb_ts or m.next_pace or m.dropped):
+                    self.out += view[start:end]
+                    self.srcs.append(sec + usec / 1000000.0 if kts else now)
+                else:
+                    self.feed(start, end, now)
+                plain, start = True, end
+            elif plain and not (t == REL and (c == X or c == Y)):
+                plain = False
+        if start < n: self.held += _EV.iter_unpack(view[start:n])
+
+    def feed(self, start, end, now):
+        # Whatever was copied so far goes first, then the frame runs through the machine.
+        m, kts = self.m, self.kts
+        if self.out: self.flush()
+        recs = _EV.iter_unpack(self.view[start:end])
+        if self.held: recs, self.held = self.held + list(recs), []
+        for sec, usec, t, c, v in recs:
+            ts = sec + usec / 1000000.0 if kts else now
+            m.advance(ts)
+            m.feed(t, c, v, ts)
+
+    def flush(self):
+        self.m.ui.forward(self.out, self.srcs)
+        self.out.clear(); self.srcs.clear()
+
+# Telemetry record kinds and log levels. Records are plain numbers so the
+# input thread never formats or allocates; see format_record().
+T_TICK, T_KEY, T_SCROLL, T_SCROLL_START, T_SCROLL_STOP, T_MMB, T_RESYNC = range(7)
+STOP_RELEASE, STOP_IDLE, STOP_MMB = range(3)
+LOG_OFF, LOG_ACTIONS, LOG_ALL = range(3)
+_STOP_TAGS = {STOP_RELEASE: "[RELEASE]", STOP_IDLE: "[SCROLL END]", STOP_MMB: "[MMB]"}
+
+# Paced output: each period emits the share of the backlog a first-order
+# follower with OUTPUT_TAU would (hi-res only; detents go out whole), so
+# periods without a report still move. Velocity is an EWMA over periods;
+# momentum coasts until it falls below COAST_MIN detents per second.
+OUTPUT_TAU = 0.012
+VELOCITY_TAU = 0.03
+COAST_MIN = 2.0
+
+# Auto-calibration: learned windows stay within the GUI's spinbox ranges and
+# take over once a statistic has this many samples.
+HOLD_RANGE, CLICK_RANGE = (0.02, 0.30), (0.01, 0.20)
+CALIBRATE_MIN = 16
+
+class TickStats:
+    # Running mean and mean deviation of tick gaps, smoothed like TCP's RTT
+    # estimator (RFC 6298); bound() is where nearly every gap falls.
+    def __init__(self):
+        self.mean = self.dev = 0.0
+        self.n = 0
+
+    def add(self, gap):
+        if self.n:
+            self.dev += 0.25 * (abs(gap - self.mean) - self.dev)
+            self.mean += 0.125 * (gap - self.mean)
+        else:
+            self.mean, self.dev = gap, gap / 2
+        self.n += 1
+
+    def bound(self):
+        return self.mean + 4 * self.dev
+
+class Telemetry:
+    # Preallocated single-producer ring of (ts, kind, code, value, out)
+    # records. The producer never blocks; a slow reader just loses the oldest.
+    def __init__(self, capacity=4096, level=LOG_ALL):
+        self.cap = capacity
+        self.level = level
+        self.ts = array("d", bytes(8 * capacity))
+        self.rec = array("i", bytes(16 * capacity))  # kind, code, value, out
+        self.head = 0  # records ever written
+
+    def put(self, ts, kind, code=0, value=0, out=0):
+        i = self.head % self.cap
+        self.ts[i] = ts
+        j = i * 4
+        self.rec[j] = kind; self.rec[j+1] = code; self.rec[j+2] = value; self.rec[j+3] = out
+        self.head += 1
+
+    def read(self, since, limit=None):
+        # -> (records, next_since, dropped); `limit` keeps only the newest.
+        h = self.head
+        start = max(since, h - (self.cap if limit is None else min(limit, self.cap)))
+        out = []
+        for n in range(start, h):
+            i = n % self.cap; j = i * 4
+            out.append((self.ts[i], self.rec[j], self.rec[j+1], self.rec[j+2], self.rec[j+3]))
+        lost = max(0, self.head - self.cap - start)  # overwritten while copying
+        if lost: out = out[lost:]
+        return out, h, start - since + lost
+
+class SharedTelemetry(Telemetry):
+    # The same ring laid out in a shared buffer (RemapperProcess), with the
+    # reader in another process: int64 head and level, then the timestamps,
+    # then 4 int32 per record. Attaching leaves level/head as they are
+    # unless `level` is given.
+    HEADER = 16
+
+    @classmethod
+    def nbytes(cls, capacity):
+        return cls.HEADER + 24 * capacity
+
+    def __init__(self, buf, level=None):
+        self.buf = buf
+        self.cap = capacity = (len(buf) - self.HEADER) // 24
+        self._mv = memoryview(buf)
+        self._hdr = self._mv[:self.HEADER].cast("q")
+        self.ts = self._mv[self.HEADER:self.HEADER + 8 * capacity].cast("d")
+        self.rec = self._mv[self.HEADER + 8 * capacity:self.nbytes(capacity)].cast("i")
+        if level is not None: self.level = level
+
+    head = property(lambda self: self._hdr[0])
+    level = property(lambda self: self._hdr[1], lambda self, v: self._hdr.__setitem__(1, v))
+
+    def put(self, ts, kind, code=0, value=0, out=0):
+        h = self._hdr[0]
+        i = h % self.cap
+        self.ts[i] = ts
+        j = i * 4
+        self.rec[j] = kind; self.rec[j+1] = code; self.rec[j+2] = value; self.rec[j+3] = out
+        self._hdr[0] = h + 1  # publish after the record is complete
+
+    def release(self):
+        # Unmap; the ring is unusable afterwards.
+        for v in (self._hdr, self.ts, self.rec, self._mv): v.release()
+        if hasattr(self.buf, "close"): self.buf.close()
+
+# End-to-end latency classes: source event timestamp -> output write().
+LAT_MOTION, LAT_SCROLL, LAT_MMB, LAT_RELEASE = range(4)
+LAT_NAMES = ("motion", "scroll", "mmb", "release")
+
+class Histogram:
+    # HDR-style log-linear histogram of microseconds: exact below 64 us, then
+    # 32 sub-buckets per power of two (~3% resolution) up to about 18 hours.
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * 32 * 32))
+        self.total = 0
+        self.max = 0
+
+    def record(self, us):
+        if us < 64: i = max(0, us)
+        else:
+            shift = us.bit_length() - 6
+            i = min(len(self.counts) - 1, 32 * shift + (us >> shift))
+        self.counts[i] += 1
+        self.total += 1
+        if us > self.max: self.max = us
+
+    @staticmethod
+    def bucket_high(i):
+        if i < 64: return i
+        shift = i // 32 - 1
+        return ((i - 32 * shift + 1) << shift) - 1
+
+    def percentile(self, p):
+        if not self.total: return 0
+        want, seen = self.total * p / 100.0, 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if c and seen >= want: return min(self.bucket_high(i), self.max)
+        return self.max
+
+    def dump(self):
+        return dict(count=self.total, max_us=self.max,
+                    **{f"p{p:g}_us": self.percentile(p) for p in (50, 90, 99, 99.9)},
+                    buckets=[[self.bucket_high(i), c] for i, c in enumerate(self.counts) if c])
+
+class LatencyStats:
+    def __init__(self):
+        self.hist = [Histogram() for _ in LAT_NAMES]
+
+    def record(self, cat, seconds):
+        self.hist[cat].record(int(seconds * 1e6))
+
+    def summary(self):
+        # One line per class that has samples: "scroll p50 0.4 p99 1.9 max 3.1 ms"
+        out = []
+        for name, h in zip(LAT_NAMES, self.hist):
+            if h.total:
+                out.append(f"{name} p50 {h.percentile(50)/1000:.1f} p99 {h.percentile(99)/1000:.1f} max {h.max/1000:.1f} ms")
+        return out
+
+    def dump(self):
+        return {name: h.dump() for name, h in zip(LAT_NAMES, self.hist)}
+
+def format_record(rec):
+    # -> (is_input, text) in the wording the logs have always used.
+    _ts, kind, code, value, _out = rec
+    if kind == T_TICK: return True, f"TICK code={code} val={value}"
+    if kind == T_KEY: return True, f"KEY code={code} val={value}"
+    if kind == T_SCROLL:
+        axis = "V" if code in (E.REL_WHEEL, E.REL_WHEEL_HI_RES) else "H"
+        hi = code in (E.REL_WHEEL_HI_RES, E.REL_HWHEEL_HI_RES)
+        return False, f"SCROLL {axis} {value}" + ("/120" if hi else "")
+    if kind == T_SCROLL_START: return False, "[SCROLL START]"
+    if kind == T_SCROLL_STOP: return False, _STOP_TAGS.get(code, "[SCROLL END]")
+    if kind == T_MMB: return False, "MMB CLICK"
+    if kind == T_RESYNC: return False, "[DEVICE LOST] buttons released" if code else "[SYN_DROPPED] resynced"
+    return False, f"? kind={kind} code={code} val={value}"
+
+class ScrollMachine:
+    # Scroll/MMB state machine. Time only enters through `now` (monotonic
+    # seconds, normally the event's kernel timestamp), so the loop can sleep
+    # until deadline() instead of polling.
+    def __init__(self, ui, scroll_idle, div_y, div_x, deadzone, max_step,
+                 hold_grace, click_gap, tel, hires=False, pace_hz=0.0, momentum=0.0, adaptive=False):
+        self.ui = ui
+        self.hires = hires
+        self.pace_hz, self.momentum = pace_hz, momentum
+        self.scroll_idle = scroll_idle
+        self.div_y, self.div_x = div_y, div_x
+        self.deadzone, self.max_step = deadzone, max_step
+        # hold_grace/click_gap are the windows in use; the configured ones
+        # are the fallback while `adaptive` is still learning (calibrate()).
+        self.fixed_hold_grace, self.fixed_click_gap = hold_grace, click_gap
+        self.adaptive = adaptive
+        self.period, self.onset = TickStats(), TickStats()  # while held; first gap of a gesture
+        self.onset_ts = 0.0
+        self.calibrate()
+        self.tel = tel
+        self.scrolling = False
+        self.last_scroll = 0.0
+        self.last_wheel_ts = 0.0
+        self.release_ts = 0.0  # hold release deadline, moved by every tick
+        self.last_code8_ts = 0.0
+        self.pending_mmb_ts = 0.0
+        self.ry = self.rx = 0.0
+        self.hy = self.hx = 0  # hi-res units not yet carried into a legacy detent
+        self.keys_down = set()
+        self.dropped = False
+        self.resync_pending = False
+        # Paced mode: motion only accumulates; pace() emits it every 1/pace_hz.
+        self.next_pace = self.pace_ts = self.pace_src = 0.0
+        self.my = self.mx = 0.0  # motion since the last pace period
+        self.moved, self.frames_in = False, 0  # input frames merged into this period
+        self.vy = self.vx = 0.0  # motion units per second
+        self.last_motion = 0.0
+        self.coasting = False
+
+    def set_params(self, params):
+        for k, v in params.items():
+            setattr(self, "fixed_" + k if k in ("hold_grace", "click_gap") else k, v)
+        self.calibrate()
+        self.release_ts = self.last_wheel_ts + self.hold_grace
+        if self.pace_hz and self.scrolling and not self.next_pace:
+            # Pacing switched on mid-gesture: start the periods from the last tick.
+            self.pace_ts, self.next_pace = self.last_scroll, self.last_scroll + 1.0 / self.pace_hz
+
+    def calibrate(self):
+        self.hold_grace, self.click_gap = self.fixed_hold_grace, self.fixed_click_gap
+        if not self.adaptive: return
+        if self.period.n >= CALIBRATE_MIN:
+            self.hold_grace = min(max(self.period.bound(), HOLD_RANGE[0]), HOLD_RANGE[1])
+        if self.onset.n >= CALIBRATE_MIN:
+            self.click_gap = min(max(self.onset.bound(), CLICK_RANGE[0]), CLICK_RANGE[1])
+
+    def learn(self, code, now):
+        # Per wheel tick, before the state moves on. Gaps up to twice the
+        # current window count, so ticks that just missed it (a release or
+        # phantom MMB) still pull it up.
+        if code == E.REL_WHEEL and self.onset_ts:
+            gap = now - self.onset_ts
+            self.onset_ts = 0.0
+            if 0 < gap <= 2 * self.click_gap: self.onset.add(gap)
+        else:
+            gap = now - self.last_wheel_ts
+            if 0 < gap <= 2 * self.hold_grace: self.period.add(gap)
+        self.calibrate()
+
+    def deadline(self):
+        dl = self.next_pace or None
+        if self.pending_mmb_ts:
+            t = self.pending_mmb_ts + self.click_gap
+            dl = t if dl is None else min(dl, t)
+        if self.scrolling:
+            t = min(self.release_ts, self.last_scroll + self.scroll_idle)
+            dl = t if dl is None else min(dl, t)
+        return dl
+
+    def advance(self, now):
+        # Fire every deadline up to `now` in order, each at its own time.
+        dl = self.deadline()
+        while dl is not None and dl <= now:
+            self.expire(dl)
+            dl = self.deadline()
+
+    def expire(self, now):
+        if self.next_pace and now >= self.next_pace:
+            self.pace(now)
+        if self.pending_mmb_ts and now >= self.pending_mmb_ts + self.click_gap:
+            self.emit_mmb(now)
+        if self.scrolling and now >= self.release_ts:
+            self.end_scroll(STOP_RELEASE, now)
+        if self.scrolling and now >= self.last_scroll + self.scroll_idle:
+            self.end_scroll(STOP_IDLE, now)
+
+    def begin_scroll(self, ts):
+        self.last_scroll = ts
+        if not self.scrolling:
+            self.scrolling = True
+            self.ry = self.rx = 0.0
+            self.hy = self.hx = 0
+            self.coasting = False
+            self.my = self.mx = self.vy = self.vx = 0.0
+            if self.pace_hz:
+                self.pace_ts, self.next_pace = ts, ts + 1.0 / self.pace_hz
+            if self.tel.level >= LOG_ACTIONS: self.tel.put(ts, T_SCROLL_START)
+
+    def end_scroll(self, reason, ts):
+        if self.scrolling:
+            self.scrolling = False
+            if self.pace_hz and reason != STOP_MMB:
+                # Paced: the backlog drains over the next periods; lifting off
+                # while still moving hands the velocity to momentum.
+                fast = abs(self.vy) >= COAST_MIN * self.div_y or abs(self.vx) >= COAST_MIN * self.div_x
+                recent = ts - self.last_motion <= self.hold_grace + 2.0 / self.pace_hz
+                self.coasting = reason == STOP_RELEASE and self.momentum > 0 and fast and recent
+            else:
+                self.ry = self.rx = 0.0
+                self.hy = self.hx = 0
+                self.next_pace = 0.0
+            if reason == STOP_RELEASE: self.ui.mark(LAT_RELEASE, self.last_wheel_ts)
+            if self.tel.level >= LOG_ACTIONS: self.tel.put(ts, T_SCROLL_STOP, reason)
+
+    def emit_mmb(self, ts):
+        ui = self.ui
+        self.end_scroll(STOP_MMB, ts)
+        ui.note(LAT_MMB, self.pending_mmb_ts)
+        ui.write(E.EV_KEY, E.BTN_MIDDLE, 1); ui.syn()
+        ui.write(E.EV_KEY, E.BTN_MIDDLE, 0); ui.syn()
+        if self.tel.level >= LOG_ACTIONS: self.tel.put(ts, T_MMB, E.BTN_MIDDLE, 1, 1)
+        self.pending_mmb_ts = 0.0
+
+    def pace(self, now):
+        # One output period: update velocity (or decay it while coasting),
+        # emit what has accumulated, schedule the next period.
+        if not self.pace_hz:  # switched off live
+            self.flush_paced(now, 1.0); self.next_pace = 0.0; self.coasting = False
+            return
+        period = 1.0 / self.pace_hz
+        dt = max(1e-4, now - self.pace_ts)
+        self.pace_ts = now
+        if self.coasting:
+            self.ry += self.vy * dt; self.rx += self.vx * dt
+            k = math.exp(-dt / self.momentum) if self.momentum > 0 else 0.0
+            self.vy *= k; self.vx *= k
+            if abs(self.vy) < COAST_MIN * self.div_y and abs(self.vx) < COAST_MIN * self.div_x:
+                self.coasting = False
+        elif self.my or self.mx:
+            a = 1.0 - math.exp(-dt / VELOCITY_TAU)
+            self.vy += a * (self.my / dt - self.vy); self.vx += a * (self.mx / dt - self.vx)
+            self.my = self.mx = 0.0
+            self.last_motion = now
+        busy = self.flush_paced(now, 1.0 - math.exp(-dt / OUTPUT_TAU))
+        if self.scrolling or self.coasting or busy:
+            self.next_pace += period
+            if self.next_pace <= now: self.next_pace = now + period  # woke late: don't burst
+        else:
+            self.ry = self.rx = 0.0
+            self.hy = self.hx = 0
+            self.next_pace = 0.0
+
+    def flush_paced(self, now, share):
+        # `share` of what ry/rx hold as one frame, max_step detents per axis
+        # for each input frame merged in; the rest waits for the next period.
+        # -> whether anything went out.
+        ui, sent = self.ui, False
+        frames, self.frames_in = max(1, self.frames_in), 0
+        for vert in (True, False):
+            acc, div = (self.ry, self.div_y) if vert else (self.rx, self.div_x)
+            if not (self.coasting or self.scrolling) and abs(acc) * 120 < div: continue  # drained
+            if self.scrolling and abs(acc) < self.deadzone: continue
+            sgn = -1 if vert else 1
+            if self.hires:
+                out = self.hires_step(acc * share, div, frames)
+                if not out: continue
+                acc -= out * div / 120
+                code, lo = (E.REL_WHEEL_HI_RES, E.REL_WHEEL) if vert else (E.REL_HWHEEL_HI_RES, E.REL_HWHEEL)
+                ui.note(LAT_SCROLL, self.pace_src or now)
+                ui.write(E.EV_REL, code, sgn * out)
+                carry = (self.hy if vert else self.hx) + sgn * out
+                det = int(carry / 120)
+                if det:
+                    ui.write(E.EV_REL, lo, det)
+                    carry -= det * 120
+                if vert: self.hy = carry
+                else: self.hx = carry
+            else:
+                out = int(acc / div)
+                if not out: continue
+                out = max(-self.max_step * frames, min(self.max_step * frames, out))
+                acc -= out * div
+                code = E.REL_WHEEL if vert else E.REL_HWHEEL
+                ui.note(LAT_SCROLL, self.pace_src or now)
+                ui.write(E.EV_REL, code, sgn * out)
+            if vert: self.ry = acc
+            else: self.rx = acc
+            self.last_scroll = now
+            sent = True
+            if self.tel.level >= LOG_ACTIONS: self.tel.put(now, T_SCROLL, code, out, sgn * out)
+        ui.syn()
+        self.pace_src = 0.0
+        return sent
+
+    def hires_step(self, acc, div, frames=1):
+        # Motion -> 1/120 detent units, capped to max_step detents per frame.
+        cap = self.max_step * 120 * frames
+        return max(-cap, min(cap, int(acc * 120 / div)))
+
+    def resync(self, keys, ts, lost=False):
+        # After SYN_DROPPED: bring forwarded buttons in line with the device.
+        ui = self.ui
+        for k in sorted(self.keys_down - keys): ui.write(E.EV_KEY, k, 0)
+        for k in sorted(keys - self.keys_down): ui.write(E.EV_KEY, k, 1)
+        ui.syn()
+        self.keys_down = set(keys)
+        self.resync_pending = False
+        if self.tel.level >= LOG_ACTIONS: self.tel.put(ts, T_RESYNC, int(lost))
+
+    def feed(self, etype, code, value, now):
+        # Output is buffered per frame and flushed on SYN_REPORT.
+        ui = self.ui
+        if self.dropped and etype != E.EV_SYN:
+            return
+        if etype == E.EV_SYN:
+            if code == E.SYN_REPORT:
+                if self.dropped:
+                    self.dropped = False
+                    self.resync_pending = True
+                else:
+                    ui.syn()
+                if self.moved: self.frames_in += 1; self.moved = False
+            elif code == E.SYN_DROPPED:
+                self.dropped = True
+                ui.discard()
+            return
+
+        if etype == E.EV_REL:
+            if code in (E.REL_WHEEL, 11, 12):
+                if self.tel.level >= LOG_ALL: self.tel.put(now, T_TICK, code, value)
+                if self.adaptive: self.learn(code, now)
+                self.last_wheel_ts = now
+                if code == E.REL_WHEEL:
+                    if (now - self.last_code8_ts) > self.click_gap:
+                        self.pending_mmb_ts = self.onset_ts = now
+                    else:
+                        self.pending_mmb_ts = 0.0
+                    self.last_code8_ts = now
+                # A learned hold window covers steady ticking, not the slower
+                # first gap of a gesture; until that second tick, wait as long
+                # as the MMB decision does.
+                self.release_ts = now + (max(self.hold_grace, self.click_gap)
+                                         if self.adaptive and self.pending_mmb_ts else self.hold_grace)
+                self.begin_scroll(now)
+                return
+
+            if code in (E.REL_X, E.REL_Y):
+                if self.scrolling and self.pace_hz:
+                    if code == E.REL_Y: self.ry += value; self.my += value
+                    else: self.rx += value; self.mx += value
+                    if not self.pace_src: self.pace_src = now
+                    self.moved = True
+                    return
+                if self.scrolling:
+                    if code == E.REL_Y:
+                        self.ry += value
+                        if abs(self.ry) >= self.deadzone and self.hires:
+                            hi = self.hires_step(self.ry, self.div_y)
+                            if hi:
+                                ui.note(LAT_SCROLL, now)
+                                ui.write(E.EV_REL, E.REL_WHEEL_HI_RES, -hi)
+                                self.ry -= hi * self.div_y / 120
+                                self.hy -= hi
+                                det = int(self.hy / 120)
+                                if det:
+                                    ui.write(E.EV_REL, E.REL_WHEEL, det)
+                                    self.hy -= det * 120
+                                self.last_scroll = now
+                                if self.tel.level >= LOG_ACTIONS: self.tel.put(now, T_SCROLL, E.REL_WHEEL_HI_RES, hi, -hi)
+                        elif abs(self.ry) >= self.deadzone:
+                            out = int(self.ry / self.div_y)
+                            if out:
+                                out = max(-self.max_step, min(self.max_step, out))
+                                ui.note(LAT_SCROLL, now)
+                                ui.write(E.EV_REL, E.REL_WHEEL, -out)
+                                self.ry -= out * self.div_y
+                                self.last_scroll = now
+                                if self.tel.level >= LOG_ACTIONS: self.tel.put(now, T_SCROLL, E.REL_WHEEL, out, -out)
+                    else:
+                        self.rx += value
+                        if abs(self.rx) >= self.deadzone and self.hires:
+                            hi = self.hires_step(self.rx, self.div_x)
+                            if hi:
+                                ui.note(LAT_SCROLL, now)
+                                ui.write(E.EV_REL, E.REL_HWHEEL_HI_RES, hi)
+                                self.rx -= hi * self.div_x / 120
+                                self.hx += hi
+                                det = int(self.hx / 120)
+                                if det:
+                                    ui.write(E.EV_REL, E.REL_HWHEEL, det)
+                                    self.hx -= det * 120
+                                self.last_scroll = now
+                                if self.tel.level >= LOG_ACTIONS: self.tel.put(now, T_SCROLL, E.REL_HWHEEL_HI_RES, hi, hi)
+                        elif abs(self.rx) >= self.deadzone:
+                            out = int(self.rx / self.div_x)
+                            if out:
+                                out = max(-self.max_step, min(self.max_step, out))
+                                ui.note(LAT_SCROLL, now)
+                                ui.write(E.EV_REL, E.REL_HWHEEL, out)
+                                self.rx -= out * self.div_x
+                                self.last_scroll = now
+                                if self.tel.level >= LOG_ACTIONS: self.tel.put(now, T_SCROLL, E.REL_HWHEEL, out, out)
+                    return
+
+                ui.note(LAT_MOTION, now)
+                ui.write(E.EV_REL, code, value)
+
+        elif etype == E.EV_KEY:
+            if self.tel.level >= LOG_ALL: self.tel.put(now, T_KEY, code, value, value)
+            if self.coasting and value == 1:  # a click stops momentum
+                self.coasting = False; self.next_pace = 0.0
+            if value == 1: self.keys_down.add(code)
+            elif value == 0: self.keys_down.discard(code)
+            ui.note(LAT_MOTION, now)
+            ui.write(E.EV_KEY, code, value)
+
+# Tuning that a running loop accepts through update_params(); `hires` changes
+# the virtual device's capabilities and needs a restart.
+LIVE_PARAMS = ("scroll_idle", "div_y", "div_x", "deadzone", "max_step", "hold_grace", "click_gap",
+               "pace_hz", "momentum", "adaptive")
+
+def coerce_param(key, value):
+    if key == "adaptive": return bool(value)
+    return int(max(1, value)) if key == "max_step" else float(value)
+
 class RemapperScroll:
     def __init__(self, name, vendor, product,
                  scroll_idle=0.15, div_y=60.0, div_x=120.0,
-                 deadzone=3.0, max_step=3, hold_grace=0.08,
-                 click_gap=0.04,
+                 deadzone=3.0, max_step=3, hold_grace=0.04,
+                 click_gap=0.02, hires=False, pace_hz=0.0, momentum=0.0, adaptive=False,
                  virtual_name="Genius-Remapped Mouse",
-                 on_recv=None, on_act=None):
+                 on_act=None, log_level=LOG_ALL, record_path=None,
+                 profiles=(), merge=True, telemetry=None):
         self.name, self.vendor, self.product = name, vendor, product
         self.scroll_idle = float(scroll_idle)
         self.div_y, self.div_x = float(div_y), float(div_x)
@@ -30,10 +819,40 @@ class RemapperScroll:
         self.hold_grace = float(hold_grace)
         self.virtual_name = virtual_name
         self.click_gap = float(click_gap)
-        self.on_recv = on_recv or (lambda _msg: None)
+        self.hires = bool(hires)
+        self.pace_hz, self.momentum = float(pace_hz), float(momentum)  # 0 = off
+        self.adaptive = bool(adaptive)  # learn hold_grace/click_gap per device
         self.on_act  = on_act  or (lambda _msg: None)
+        self.telemetry = telemetry if telemetry is not None else Telemetry(level=log_level)
+        self.latency = LatencyStats()
+        self.record_path = record_path
+        # Further source devices: device_name/vendor/product plus any tuning
+        # keys that differ from the values above. Every grabbed node gets its
+        # own ScrollMachine; `merge` sends them all to one virtual pointer,
+        # otherwise each profile gets its own.
+        self.profiles = [dict(device_name=p["device_name"], vendor=int(p["vendor"]), product=int(p["product"]),
+                              **{k: coerce_param(k, p[k]) for k in LIVE_PARAMS if k in p}) for p in profiles]
+        self.merge = bool(merge)
         self._thr = None
         self._stop = threading.Event()
+        self._wake_w = None
+        self._pending = None  # tuning waiting for the next frame boundary
+        self._live = {}  # device path -> its ScrollMachine while the loop runs
+        self._plock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg, **kw):
+        # Build from the schema of mouse_remapper_config.load_cfg().
+        return cls(cfg["device_name"], cfg["vendor"], cfg["product"],
+                   cfg["scroll_idle"], cfg["div_y"], cfg["div_x"],
+                   cfg["deadzone"], cfg["max_step"], cfg["hold_grace"], cfg["click_gap"],
+                   hires=cfg.get("hires", False), pace_hz=cfg.get("pace_hz", 0.0), momentum=cfg.get("momentum", 0.0),
+                   adaptive=cfg.get("adaptive", False), profiles=cfg.get("devices", ()),
+                   merge=cfg.get("merge_devices", True), **kw)
+
+    def layout(self):
+        # Everything that can't change without re-grabbing (see update_params).
+        return (self.name, self.vendor, self.product, self.hires, self.profiles, self.merge)
 
     def start(self):
         self.stop()
@@ -44,132 +863,555 @@ class RemapperScroll:
     def stop(self):
         if self._thr and self._thr.is_alive():
             self._stop.set()
+            self._wake()
             self._thr.join(timeout=1.0)
         self._thr = None
 
     def is_running(self):
         return bool(self._thr and self._thr.is_alive())
 
+    def update_params(self, **params):
+        # Thread-safe; the loop swaps the values in between frames. Values a
+        # profile overrides stay as they are for that profile's devices.
+        bad = set(params) - set(LIVE_PARAMS)
+        if bad: raise ValueError(f"not live-tunable: {', '.join(sorted(bad))}")
+        params = {k: coerce_param(k, v) for k, v in params.items()}
+        with self._plock:
+            for k, v in params.items(): setattr(self, k, v)
+            self._pending = {**(self._pending or {}), **params}
+        self._wake()  # deadlines may have moved
+
+    def calibration(self):
+        # Windows in use per grabbed node and the tick statistics behind them.
+        return [dict(device=path, hold_grace=m.hold_grace, click_gap=m.click_gap,
+                     period=m.period.mean, ticks=m.period.n, onset=m.onset.mean, onsets=m.onset.n)
+                for path, m in list(self._live.items())]
+
+    def status(self):
+        # Everything the GUI shows once a second, in one call (one round trip remotely).
+        return dict(running=self.is_running(), device=self.name,
+                    latency=self.latency.summary(), calibration=self.calibration())
+
+    def tuning(self, profile=0):
+        t = {k: getattr(self, k) for k in LIVE_PARAMS}
+        if profile: t.update((k, v) for k, v in self.profiles[profile - 1].items() if k in t)
+        return t
+
+    def make_machine(self, ui, profile=0):
+        return ScrollMachine(ui, tel=self.telemetry, hires=self.hires, **self.tuning(profile))
+
+    def _wake(self):
+        try: os.write(self._wake_w, b"\0")
+        except (OSError, TypeError): pass
+
     def _run(self):
+        ep = rec = devs = None
+        wake_r = wake_w = None
+        uis = {}  # output slot -> UInput: 0 when merged, else the profile index
         try:
-            srcs = []
-            for path in list_devices():
-                d = InputDevice(path)
-                if d.name == self.name and d.info.vendor == self.vendor and d.info.product == self.product:
-                    rel = d.capabilities().get(E.EV_REL, [])
-                    if E.REL_X in rel or E.REL_Y in rel or E.REL_WHEEL in rel or 11 in rel or 12 in rel:
-                        srcs.append(d)
-            if not srcs:
-                self.on_act("No matching devices with EV_REL."); return
-
-            for d in srcs: d.grab()
-            self.on_act("Grabbed: " + ", ".join([d.path for d in srcs]))
+            devs = DeviceManager(self.name, self.vendor, self.product,
+                                 extra=[(p["device_name"], p["vendor"], p["product"]) for p in self.profiles])
+            srcs = devs.scan()
+            if srcs: self.on_act("Grabbed: " + ", ".join([d.path for d in srcs]))
+            else: self.on_act("No matching devices with EV_REL yet, waiting for one to appear.")
 
             caps = {E.EV_KEY:[E.BTN_LEFT,E.BTN_RIGHT,E.BTN_MIDDLE,E.BTN_SIDE,E.BTN_EXTRA],
                     E.EV_REL:[E.REL_X,E.REL_Y,E.REL_WHEEL,E.REL_HWHEEL]}
-            ui = UInput(caps, name=self.virtual_name, bustype=srcs[0].info.bustype,
-                        vendor=self.vendor, product=self.product)
-            self.on_act(f"Created virtual device: {self.virtual_name}")
-
-            scrolling = False
-            last_scroll = 0.0
-            last_wheel_ts = 0.0
-            last_code8_ts = 0.0
-            pending_mmb_ts = 0.0
-            ry = rx = 0.0
-
-            def syn(): ui.syn()
-
-            def begin_scroll(ts):
-                nonlocal scrolling, last_scroll, ry, rx
-                last_scroll = ts
-                if not scrolling:
-                    scrolling = True
-                    ry = rx = 0.0
-                    self.on_act("[SCROLL START]")
-
-            def end_scroll(tag):
-                nonlocal scrolling, ry, rx
-                if scrolling:
-                    scrolling = False
-                    ry = rx = 0.0
-                    self.on_act(tag)
-
-            def emit_mmb():
-                nonlocal pending_mmb_ts
-                end_scroll("[MMB]")
-                ui.write(E.EV_KEY, E.BTN_MIDDLE, 1); syn()
-                ui.write(E.EV_KEY, E.BTN_MIDDLE, 0); syn()
-                self.on_act("MMB CLICK")
-                pending_mmb_ts = 0.0
+            if self.hires:
+                caps[E.EV_REL] += [E.REL_WHEEL_HI_RES, E.REL_HWHEEL_HI_RES]
+
+            if self.record_path:
+                rec = Recorder(self.record_path)
+                self.on_act(f"Recording to {self.record_path}")
+
+            # Sleep until input, stop(), hotplug or the next state-machine deadline.
+            wake_r, wake_w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+            self._wake_w = wake_w
+            ep = select.epoll()
+            ep.register(wake_r, select.EPOLLIN)
+            machines = {}  # fd -> ScrollMachine of that node
+            feeds = {}  # fd -> RawFeed reading that node into its machine
+            armed = set()  # machines with a deadline; wake-up cost scales with these, not with sources
+            sources = {}  # node path -> its source index in the capture
+
+            def output(slot, bustype):
+                if slot not in uis:
+                    name = self.virtual_name if slot == 0 else f"{self.virtual_name} {slot + 1}"
+                    _, vendor, product = devs.targets[slot]
+                    uis[slot] = UInput(caps, name=name, bustype=bustype, vendor=vendor, product=product)
+                    self.on_act(f"Created virtual device: {name}")
+                return uis[slot]
+
+            def attach(d):
+                prof = devs.profile[d.fd]
+                ui = output(0 if self.merge else prof, d.info.bustype)
+                m = machines[d.fd] = self._live[d.path] = self.make_machine(FrameWriter(ui, self.latency), prof)
+                if d.path not in sources:
+                    sources[d.path] = len(sources)
+                    if rec: self.on_act(f"Recording {d.path} as source {sources[d.path]}")
+                feeds[d.fd] = RawFeed(d.fd, m, devs.mono[d.fd], rec, sources[d.path])
+                ep.register(d.fd, select.EPOLLIN)
+
+            for d in srcs: attach(d)
+            if not srcs: output(0, E.BUS_USB)  # present from the start, like after a disconnect
+            try:
+                watch_fd = devs.start_watch()
+                ep.register(watch_fd, select.EPOLLIN)
+            except OSError as e:
+                watch_fd = None
+                self.on_act(f"Hotplug watch unavailable: {e}")
+                if not srcs: return
+            lost_at = None
 
             while not self._stop.is_set():
-                fds = [d.fd for d in srcs]
-                r,_,_ = select.select(fds, [], [], 0.01)
-                now = time.time()
-
-                if pending_mmb_ts and (now - pending_mmb_ts) > self.click_gap:
-                    emit_mmb()
-
-                if scrolling and (now - last_wheel_ts) > self.hold_grace:
-                    end_scroll("[RELEASE]")
-
-                if scrolling and now - last_scroll >= self.scroll_idle:
-                    end_scroll("[SCROLL END]")
-
-                if not r: continue
-                for d in [s for s in srcs if s.fd in r]:
-                    for ev in d.read():
-                        if ev.type == E.EV_REL:
-                            if ev.code in (E.REL_WHEEL, 11, 12):
-                                self.on_recv(f"TICK code={ev.code} val={ev.value}")
-                                last_wheel_ts = now
-                                if ev.code == E.REL_WHEEL:
-                                    if (now - last_code8_ts) > self.click_gap:
-                                        pending_mmb_ts = now
-                                    else:
-                                        pending_mmb_ts = 0.0
-                                    last_code8_ts = now
-                                begin_scroll(now)
-                                continue
-
-                            if ev.code in (E.REL_X, E.REL_Y):
-                                # self.on_recv(f"MOVE {'X' if ev.code==E.REL_X else 'Y'} {ev.value}")
-                                if scrolling:
-                                    if ev.code == E.REL_Y:
-                                        ry += ev.value
-                                        if abs(ry) >= self.deadzone:
-                                            out = int(ry / self.div_y)
-                                            if out:
-                                                out = max(-self.max_step, min(self.max_step, out))
-                                                ui.write(E.EV_REL, E.REL_WHEEL, -out); syn()
-                                                ry -= out * self.div_y
-                                                last_scroll = now
-                                                self.on_act(f"SCROLL V {out}")
-                                    else:
-                                        rx += ev.value
-                                        if abs(rx) >= self.deadzone:
-                                            out = int(rx / self.div_x)
-                                            if out:
-                                                out = max(-self.max_step, min(self.max_step, out))
-                                                ui.write(E.EV_REL, E.REL_HWHEEL, out); syn()
-                                                rx -= out * self.div_x
-                                                last_scroll = now
-                                                self.on_act(f"SCROLL H {out}")
-                                    continue
-
-                                ui.write(E.EV_REL, ev.code, ev.value); syn()
-
-                        elif ev.type == E.EV_KEY:
-                            self.on_recv(f"KEY code={ev.code} val={ev.value}")
-                            ui.write(E.EV_KEY, ev.code, ev.value); syn()
+                dl = None
+                for m in armed:
+                    t = m.deadline()
+                    if t is not None and (dl is None or t < dl): dl = t
+                ready = ep.poll(-1 if dl is None else max(0.0, dl - time.monotonic()))
+                # Everything stamped before `now` is already queued: replay it in
+                # event time first, so a late wake-up can't fire a timer that a
+                # queued tick would have cancelled.
+                now = time.monotonic()
+                if self._pending is not None:
+                    with self._plock: params, self._pending = self._pending, None
+                    for fd, m in machines.items():
+                        prof = devs.profile[fd]
+                        m.set_params({k: v for k, v in params.items()
+                                      if not (prof and k in self.profiles[prof - 1])})
+
+                for fd, _ in ready:
+                    if fd == wake_r:
+                        try: os.read(wake_r, 64)
+                        except BlockingIOError: pass
+                        continue
+                    if fd == watch_fd:
+                        for d in devs.added():
+                            attach(d)
+                            t = time.monotonic()
+                            gap = f", {(t - lost_at)*1000:.0f} ms after loss" if lost_at else ""
+                            self.on_act(f"{'Re-grabbed' if lost_at else 'Grabbed'} {d.path} in {(t - now)*1000:.1f} ms{gap}")
+                            lost_at = None
+                        continue
+                    d = devs.devices.get(fd)
+                    if d is None: continue
+                    m = machines[fd]
+                    try:
+                        feeds[fd].read(now)
+                    except BlockingIOError:
+                        continue
+                    except OSError as e:
+                        # Receiver asleep or re-enumerated: keep the virtual device and
+                        # release anything it was holding; the watch brings the node back.
+                        ep.unregister(fd); devs.drop(d); del machines[fd], feeds[fd]; armed.discard(m)
+                        self._live.pop(d.path, None)
+                        m.ui.discard(); m.resync(set(), now, lost=True)
+                        lost_at = now
+                        self.on_act(f"Lost {d.path} ({errno.errorcode.get(e.errno, e.errno)}), waiting for reconnect")
+                        continue
+                    if m.resync_pending:
+                        m.resync(set(d.active_keys()), now)
+                    if m.deadline() is not None: armed.add(m)
+
+                if armed:
+                    for m in list(armed):
+                        m.advance(now)
+                        if m.deadline() is None: armed.discard(m)
 
         except Exception as e:
             self.on_act("ERROR: " + "".join(traceback.format_exception_only(type(e), e)).strip())
         finally:
+            self._wake_w = None
+            self._live = {}
             try:
-                for d in locals().get("srcs", []):
-                    try: d.ungrab()
-                    except: pass
+                if ep is not None: ep.close()
+                if rec is not None: rec.close()
+                for fd in (wake_r, wake_w):
+                    if fd is not None: os.close(fd)
+                if devs is not None: devs.close()
             finally:
-                if "ui" in locals(): ui.close()
+                for ui in uis.values(): ui.close()
+
+class Daemon:
+    # Headless owner of one RemapperScroll, driven by signals and ControlServer.
+    # A fixed `cfg` dict replaces the file (RemapperProcess children).
+    def __init__(self, cfg_path, record_path=None, log=print, cfg=None, telemetry=None):
+        self.cfg_path, self.record_path = cfg_path, record_path
+        self.cfg, self.telemetry = cfg, telemetry
+        self.log = log
+        self.lock = threading.RLock()
+        self.remap = None
+        self.listeners = []  # extra on_act sinks (socket clients)
+
+    def act(self, msg):
+        self.log(msg)
+        for fn in list(self.listeners): fn(msg)
+
+    def load(self):
+        from mouse_remapper_config import load_cfg
+        return dict(self.cfg) if self.cfg is not None else load_cfg(self.cfg_path)
+
+    def start(self):
+        with self.lock:
+            if self.remap and self.remap.is_running(): return
+            cfg = self.load()
+            self.act(f"Starting: {cfg['device_name']}")
+            self.remap = RemapperScroll.from_config(cfg, on_act=self.act,
+                                                    log_level=LOG_ALL if self.listeners else LOG_OFF,
+                                                    record_path=self.record_path, telemetry=self.telemetry)
+            self.remap.start()
+
+    def stop(self):
+        with self.lock:
+            if self.remap: self.remap.stop()
+
+    def reload(self):
+        with self.lock:
+            r = self.remap
+            running = bool(r and r.is_running())
+            cfg = self.load()
+            self.act(f"Reloading {self.cfg_path}")
+            if running and r.layout() == RemapperScroll.from_config(cfg, log_level=LOG_OFF).layout():
+                r.update_params(**{k: cfg[k] for k in LIVE_PARAMS})
+                return
+            self.stop()
+            if running: self.start()
+
+    def update_params(self, **params):
+        with self.lock:
+            if self.remap: self.remap.update_params(**params)
+
+    def status(self):
+        with self.lock:
+            r = self.remap
+            return r.status() if r else dict(running=False, device="", latency=[], calibration=[])
+
+class ControlServer:
+    # Unix-socket endpoint of the daemon. JSON lines both ways: clients send
+    # {"cmd": "status"|"start"|"stop"|"reload"|"latency"} or
+    # {"cmd": "set", "params": {...}}, the server answers
+    # {"reply": cmd, ...} and pushes {"act": msg} and {"tel": [records]}.
+    # Without a path it only serves sockets handed to adopt(); with
+    # push_tel off, telemetry (and its level) is shared memory's business.
+    # Only the server thread writes to clients; act() from the input thread
+    # just queues, so it never waits on a socket.
+    PUSH_S = 0.05
+
+    def __init__(self, path, daemon, push_tel=True):
+        import selectors
+        self.path, self.daemon, self.push_tel = path, daemon, push_tel
+        self.sel = selectors.DefaultSelector()
+        self.sock = None
+        if path:
+            try: os.unlink(path)
+            except FileNotFoundError: pass
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.bind(path); os.chmod(path, 0o600); self.sock.listen(4)
+            self.sel.register(self.sock, selectors.EVENT_READ)
+        self.clients = {}  # socket -> input buffer
+        self.seq, self.seq_owner = 0, None
+        self.acts = deque()  # act messages for the next push
+        self.lock = threading.Lock()
+        self._stop = False
+        daemon.listeners.append(self.queue_act)
+        self._thr = threading.Thread(target=self._serve, daemon=True)
+        self._thr.start()
+
+    def adopt(self, c):
+        import selectors
+        c.settimeout(0.5)  # a stuck client must not stall on_act callers
+        with self.lock: self.clients[c] = b""
+        self.sel.register(c, selectors.EVENT_READ)
+        self._set_level()
+
+    def send(self, c, msg):
+        try: c.sendall((json.dumps(msg) + "\n").encode())
+        except OSError: self.drop(c)
+
+    def queue_act(self, msg):
+        if self.clients: self.acts.append(msg)
+
+    def broadcast(self, msg):
+        with self.lock: clients = list(self.clients)
+        for c in clients: self.send(c, msg)
+
+    def drop(self, c):
+        with self.lock:
+            if self.clients.pop(c, None) is None: return
+        try: self.sel.unregister(c)
+        except (KeyError, ValueError): pass
+        c.close()
+        self._set_level()
+
+    def _set_level(self):
+        # Record per-event telemetry only while someone is listening.
+        r = self.daemon.remap
+        if r and self.push_tel: r.telemetry.level = LOG_ALL if self.clients else LOG_OFF
+
+    def handle(self, c, msg):
+        if not isinstance(msg, dict):
+            self.send(c, dict(reply=None, error="expected a JSON object")); return
+        cmd = msg.get("cmd")
+        d = self.daemon
+        if cmd == "start": d.start(); self._set_level()
+        elif cmd == "stop": d.stop()
+        elif cmd == "reload": d.reload(); self._set_level()
+        elif cmd == "set":
+            try: d.update_params(**msg.get("params", {}))
+            except (TypeError, ValueError) as e:
+                self.send(c, dict(reply=cmd, error=str(e))); return
+        elif cmd == "latency":
+            r = d.remap
+            self.send(c, dict(reply=cmd, latency=r.latency.dump() if r else {})); return
+        elif cmd != "status":
+            self.send(c, dict(reply=cmd, error="unknown command")); return
+        self.send(c, dict(reply=cmd, **d.status()))
+
+    def _push(self):
+        while self.acts: self.broadcast(dict(act=self.acts.popleft()))
+        r = self.daemon.remap
+        if not r or not self.clients or not self.push_tel: return
+        if r is not self.seq_owner: self.seq, self.seq_owner = r.telemetry.head, r
+        recs, self.seq, _dropped = r.telemetry.read(self.seq)
+        if recs: self.broadcast(dict(tel=recs))
+
+    def _serve(self):
+        while not self._stop:
+            for key, _ in self.sel.select(self.PUSH_S if self.clients else None):
+                if key.fileobj is self.sock:
+                    try: c, _ = self.sock.accept()
+                    except OSError: continue
+                    self.adopt(c)
+                    continue
+                c = key.fileobj
+                try: data = c.recv(4096)
+                except OSError: data = b""
+                if not data: self.drop(c); continue
+                buf = self.clients.get(c, b"") + data
+                *lines, rest = buf.split(b"\n")
+                if c in self.clients: self.clients[c] = rest
+                for line in lines:
+                    try: msg = json.loads(line)
+                    except ValueError: continue
+                    self.handle(c, msg)
+            self._push()
+
+    def close(self):
+        self._stop = True
+        for c in list(self.clients): self.drop(c)
+        if self.sock is None: return
+        self.sock.close()
+        try: os.unlink(self.path)
+        except FileNotFoundError: pass
+
+class RemoteLatency:
+    def __init__(self, client): self.client = client
+    def summary(self): return self.client.call("status").get("latency", [])
+    def dump(self): return self.client.call("latency").get("latency", {})
+
+class DaemonClient:
+    # GUI side of `--socket`: the same start/stop/is_running/telemetry/latency
+    # surface as RemapperScroll, backed by a running daemon.
+    def __init__(self, path, on_act=None, timeout=0.5, sock=None):
+        self.on_act = on_act or (lambda _msg: None)
+        self.timeout = timeout
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(path)
+        self.sock = sock
+        self.telemetry = Telemetry(level=LOG_ALL)
+        self.latency = RemoteLatency(self)
+        self.name = path
+        self._replies = {}
+        self._cond = threading.Condition()
+        self._thr = threading.Thread(target=self._read, daemon=True)
+        self._thr.start()
+
+    def _read(self):
+        buf = b""
+        while True:
+            try: data = self.sock.recv(65536)
+            except OSError: data = b""
+            if not data: break
+            *lines, buf = (buf + data).split(b"\n")
+            for line in lines:
+                try: msg = json.loads(line)
+                except ValueError: continue
+                if not isinstance(msg, dict): continue
+                if "tel" in msg:
+                    if self.telemetry.level:
+                        for rec in msg["tel"]: self.telemetry.put(*rec)
+                elif "act" in msg: self.on_act(msg["act"])
+                elif "reply" in msg:
+                    with self._cond:
+                        self._replies[msg["reply"]] = msg; self._cond.notify_all()
+        self.on_act("Daemon connection closed.")
+        with self._cond: self._cond.notify_all()
+
+    def call(self, cmd, **extra):
+        with self._cond:
+            self._replies.pop(cmd, None)
+            try: self.sock.sendall((json.dumps(dict(cmd=cmd, **extra)) + "\n").encode())
+            except OSError: return {}
+            self._cond.wait_for(lambda: cmd in self._replies or not self._thr.is_alive(), self.timeout)
+            return self._replies.pop(cmd, {})
+
+    def close(self):
+        # Hang up: the reader ends and the daemon drops us from its pushes.
+        self.on_act = lambda _msg: None  # on purpose, not worth a log line
+        try: self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError: pass
+        self._thr.join(timeout=1.0)
+        self.sock.close()
+
+    def start(self): self.call("start")
+    def stop(self): self.call("stop")
+    def is_running(self): return bool(self.call("status").get("running"))
+    def status(self): return self.call("status")
+    def update_params(self, **params): self.call("set", params=params)
+    def calibration(self): return self.call("status").get("calibration", [])
+
+def set_priority(spec=None, cpus=None):
+    # For the calling thread and every thread it starts afterwards.
+    # spec: "fifo:N" (SCHED_FIFO, priority N) or "nice:N".
+    if cpus: os.sched_setaffinity(0, cpus)
+    kind, _, val = (spec or "").partition(":")
+    if kind == "fifo": os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(int(val or 10)))
+    elif kind == "nice": os.setpriority(os.PRIO_PROCESS, 0, int(val))
+    elif kind: raise ValueError(f"unknown priority {spec!r} (use fifo:N or nice:N)")
+
+class RemapperProcess:
+    # RemapperScroll in a child process (this file's main() with --control-fd),
+    # out of reach of the GUI's GIL. Same start/stop/is_running/telemetry/
+    # latency surface; control runs the ControlServer protocol over a
+    # socketpair, telemetry is a Telemetry ring in a shared memfd.
+    TELEMETRY_CAP = 4096
+
+    def __init__(self, cfg, on_act=None, log_level=LOG_ALL, record_path=None, priority=None, cpus=None):
+        self.cfg = dict(cfg)
+        self.name = cfg["device_name"]
+        self.on_act = on_act or (lambda _msg: None)
+        self.record_path, self.priority, self.cpus = record_path, priority, cpus
+        self._tfd = os.memfd_create("genius-remapper-telemetry", os.MFD_CLOEXEC)
+        os.ftruncate(self._tfd, SharedTelemetry.nbytes(self.TELEMETRY_CAP))
+        self.telemetry = SharedTelemetry(mmap.mmap(self._tfd, 0), level=log_level)
+        self.latency = RemoteLatency(self)
+        self.pass_fds = ()  # more fds for the child (bench harness)
+        self.proc = self.client = None
+
+    @classmethod
+    def from_config(cls, cfg, **kw):
+        return cls(cfg, priority=cfg.get("priority") or None, cpus=cfg.get("cpus") or None, **kw)
+
+    def command(self, ctl_fd):
+        cmd = [sys.executable, os.path.abspath(__file__), "--config", "-",
+               "--control-fd", str(ctl_fd), "--telemetry-fd", str(self._tfd)]
+        if self.record_path: cmd += ["--record", self.record_path]
+        if self.priority: cmd += ["--priority", self.priority]
+        if self.cpus: cmd += ["--cpus", ",".join(map(str, self.cpus))]
+        return cmd
+
+    def start(self):
+        import subprocess
+        self.stop()
+        ours, theirs = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.proc = subprocess.Popen(self.command(theirs.fileno()), stdin=subprocess.PIPE,
+                                         pass_fds=(theirs.fileno(), self._tfd, *self.pass_fds))
+        finally:
+            theirs.close()
+        self.proc.stdin.write(json.dumps(self.cfg).encode()); self.proc.stdin.close()
+        self.client = DaemonClient(None, on_act=self.on_act, timeout=2.0, sock=ours)
+
+    def stop(self):
+        import subprocess
+        if self.client: self.client.on_act = lambda _msg: None  # the hang-up is expected
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()  # SIGTERM: the child ungrabs and exits
+            try: self.proc.wait(timeout=2.0)
+            except subprocess.TimeoutExpired: self.proc.kill(); self.proc.wait()
+        if self.client: self.client.sock.close()
+        self.proc = self.client = None
+
+    def __del__(self):
+        # Not in stop(): the GUI still drains the ring after stopping, and
+        # start() reuses it.
+        try: self.telemetry.release()
+        except (AttributeError, BufferError, ValueError): pass
+        try: os.close(self._tfd)
+        except (AttributeError, OSError): pass
+
+    def call(self, cmd, **extra):
+        return self.client.call(cmd, **extra) if self.client else {}
+
+    def is_running(self):
+        return bool(self.proc and self.proc.poll() is None and self.call("status").get("running"))
+
+    def calibration(self):
+        return self.call("status").get("calibration", [])
+
+    def status(self):
+        return self.call("status") if self.proc and self.proc.poll() is None else {}
+
+    def update_params(self, **params):
+        err = self.call("set", params=params).get("error")
+        if err: raise ValueError(err)
+
+def main(argv=None):
+    # Headless entry point: python -m mouse_remapper_core [--config PATH]
+    import argparse, signal
+    from pathlib import Path
+    from mouse_remapper_config import CFG
+    ap = argparse.ArgumentParser(prog="python -m mouse_remapper_core",
+                                 description="Run the scroll remapper without the GUI.")
+    ap.add_argument("--config", default=str(CFG), help=f"config file (default {CFG})")
+    ap.add_argument("--socket", help="serve status, control and telemetry on this Unix socket")
+    ap.add_argument("--record", help="capture the raw input stream to this file")
+    ap.add_argument("--dump-latency", help="write latency histograms as JSON here on exit ('-' for stdout)")
+    ap.add_argument("--priority", help="fifo:N for SCHED_FIFO priority N, or nice:N")
+    ap.add_argument("--cpus", help="comma-separated CPUs to pin the remapper to")
+    ap.add_argument("--control-fd", type=int, help=argparse.SUPPRESS)    # set by RemapperProcess
+    ap.add_argument("--telemetry-fd", type=int, help=argparse.SUPPRESS)  # set by RemapperProcess
+    a = ap.parse_args(argv)
+
+    child = a.control_fd is not None
+    if child:
+        ctypes.CDLL(None, use_errno=True).prctl(PR_SET_PDEATHSIG, signal.SIGTERM)  # go with the GUI
+    log = (lambda msg: None) if child else (lambda msg: print(msg, flush=True))
+    cfg = json.load(sys.stdin) if a.config == "-" else None
+    tel = SharedTelemetry(mmap.mmap(a.telemetry_fd, 0)) if a.telemetry_fd is not None else None
+    d = Daemon(Path(a.config).expanduser(), a.record, log=log, cfg=cfg, telemetry=tel)
+    server = None
+    if child:
+        server = ControlServer(None, d, push_tel=tel is None)
+        server.adopt(socket.socket(fileno=a.control_fd))
+    elif a.socket:
+        server = ControlServer(a.socket, d)
+    try: set_priority(a.priority, [int(c) for c in a.cpus.split(",")] if a.cpus else None)
+    except (OSError, ValueError) as e: d.act(f"Priority not applied ({a.priority or ''} {a.cpus or ''}): {e}")
+    wake = threading.Event()
+    todo = set()
+    def on_signal(sig, _frame):
+        todo.add(sig); wake.set()
+    for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, on_signal)
+
+    d.start()
+    try:
+        while True:
+            wake.wait(); wake.clear()
+            if todo & {signal.SIGTERM, signal.SIGINT}: break
+            if signal.SIGHUP in todo:
+                todo.discard(signal.SIGHUP); d.reload()
+    finally:
+        d.stop()
+        if server: server.close()
+        if tel: tel.release()
+        if a.dump_latency and d.remap:
+            text = json.dumps(d.remap.latency.dump(), indent=2)
+            if a.dump_latency == "-": print(text)
+            else: Path(a.dump_latency).write_text(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# mouse_remapper_replay.py
+import sys, copy, json, mmap, time, argparse
+from mouse_remapper_core import RemapperScroll, CAPTURE_MAGIC, CAPTURE_REC, CAPTURE_MAGIC_V1, CAPTURE_REC_V1, LOG_OFF, LIVE_PARAMS
+
+TUNING = LIVE_PARAMS + ("hires",)
+
+class CaptureSink:
+    # Stands in for FrameWriter: keeps every emitted frame with the time it left.
+    def __init__(self):
+        self.now = 0.0
+        self.buf = []
+        self.frames = []
+        self.marks = []  # (latency class, seconds) of decisions that emit nothing
+
+    def write(self, etype, code, value):
+        self.buf.append((etype, code, value))
+
+    def syn(self):
+        if self.buf:
+            self.frames.append((self.now, tuple(self.buf)))
+            self.buf = []
+
+    def discard(self):
+        self.buf = []
+
+    def note(self, cat, src_ts): pass
+    def mark(self, cat, src_ts): self.marks.append((cat, self.now - src_ts))
+
+def load_capture(path):
+    # -> memoryview of the packed records; the mapping lives as long as the view.
+    # Old single-node captures are converted to source 0.
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    hdr = len(CAPTURE_MAGIC)
+    if mm[:hdr] == CAPTURE_MAGIC_V1:
+        n = (len(mm) - hdr) // CAPTURE_REC_V1.size
+        return memoryview(b"".join(CAPTURE_REC.pack(*r, 0) for r in
+                                   CAPTURE_REC_V1.iter_unpack(mm[hdr:hdr + n * CAPTURE_REC_V1.size])))
+    if mm[:hdr] != CAPTURE_MAGIC:
+        raise ValueError(f"{path}: not a capture file")
+    n = (len(mm) - hdr) // CAPTURE_REC.size
+    return memoryview(mm)[hdr:hdr + n * CAPTURE_REC.size]
+
+def replay(records, params=None, realtime=False, sink=None):
+    # Drive the same ScrollMachines as RemapperScroll._run, one per source
+    # node, with capture timestamps as the clock. Returns the emitted frames.
+    sink = sink or CaptureSink()
+    r = RemapperScroll("", 0, 0, log_level=LOG_OFF, **(params or {}))
+    machines = {}  # source -> ScrollMachine writing to its own view of `sink`
+    t0 = w0 = None
+
+    def fire_until(ts):
+        # Deadlines up to ts, in time order across machines.
+        while True:
+            dl = m = None
+            for mm in machines.values():
+                t = mm.deadline()
+                if t is not None and (dl is None or t < dl): dl, m = t, mm
+            if dl is None or dl > ts: return
+            if realtime: wait(dl)
+            m.ui.now = dl; m.expire(dl)
+
+    def wait(ts):
+        dt = (ts - t0) - (time.monotonic() - w0)
+        if dt > 0: time.sleep(dt)
+
+    for ts, etype, code, value, src in CAPTURE_REC.iter_unpack(records):
+        if t0 is None: t0, w0 = ts, time.monotonic()
+        fire_until(ts)
+        m = machines.get(src)
+        if m is None:
+            # Like a FrameWriter per node: a frame half-built by one source
+            # can't pick up another's output. Frames and marks stay shared.
+            ui = sink if not machines else copy.copy(sink)
+            ui.buf = []
+            m = machines[src] = r.make_machine(ui)
+        if realtime: wait(ts)
+        m.ui.now = ts
+        m.feed(etype, code, value, ts)
+        if m.resync_pending:
+            m.resync(set(m.keys_down), ts)  # key state isn't captured; assume unchanged
+    fire_until(float("inf"))
+    return sink.frames
+
+def format_frames(frames, t0=0.0):
+    return [f"{t - t0:.6f} " + " ".join(f"{e}:{c}:{v}" for e, c, v in evs) for t, evs in frames]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Replay a raw capture through the scroll/MMB state machine.")
+    ap.add_argument("capture", help="file written by RemapperScroll(record_path=...) / --record")
+    ap.add_argument("--config", help="JSON config to take tuning values from (same schema as the app)")
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="override one tuning value")
+    ap.add_argument("--realtime", action="store_true", help="pace the replay like the original session")
+    ap.add_argument("--golden", help="compare emitted frames with this file")
+    ap.add_argument("--update-golden", action="store_true", help="write the emitted frames to --golden instead")
+    ap.add_argument("--print", action="store_true", dest="show", help="print the emitted frames")
+    a = ap.parse_args(argv)
+
+    params = {}
+    if a.config:
+        cfg = json.loads(open(a.config).read())
+        params = {k: cfg[k] for k in TUNING if k in cfg}
+    for kv in a.set:
+        k, _, v = kv.partition("=")
+        if k not in TUNING: ap.error(f"unknown tuning key: {k}")
+        params[k] = json.loads(v)
+
+    records = load_capture(a.capture)
+    n = len(records) // CAPTURE_REC.size
+    t = time.perf_counter()
+    frames = replay(records, params, a.realtime)
+    dt = time.perf_counter() - t
+    t0 = CAPTURE_REC.unpack_from(records)[0] if n else 0.0
+    lines = format_frames(frames, t0)
+
+    if a.show: print("\n".join(lines))
+    print(f"{n} events -> {len(frames)} frames in {dt*1000:.1f} ms ({n / dt if dt else 0:.0f} events/s)", file=sys.stderr)
+
+    if a.golden and a.update_golden:
+        open(a.golden, "w").write("\n".join(lines) + "\n")
+    elif a.golden:
+        want = open(a.golden).read().splitlines()
+        for i, (got, exp) in enumerate(zip(lines, want)):
+            if got != exp:
+                print(f"frame {i}: got '{got}', expected '{exp}'", file=sys.stderr); return 1
+        if len(lines) != len(want):
+            print(f"got {len(lines)} frames, expected {len(want)}", file=sys.stderr); return 1
+        print("golden: OK", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
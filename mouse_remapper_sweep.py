@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# mouse_remapper_sweep.py
+import os, re, sys, json, math, time, struct, bisect, argparse, itertools
+from concurrent.futures import ProcessPoolExecutor
+from mouse_remapper_core import CAPTURE_MAGIC, CAPTURE_REC, CAPTURE_MAGIC_V1, LAT_MMB, LAT_RELEASE, E
+from mouse_remapper_replay import TUNING, CaptureSink, load_capture, replay
+from mouse_remapper_config import DEFAULTS
+try:
+    import numpy as np
+except ImportError:  # every combination then goes through the reference replay
+    np = None
+
+GRID_KEYS = ("div_y", "div_x", "deadzone", "max_step", "hold_grace", "click_gap")
+DEFAULT_GRID = dict(div_y=(5.0, 8.0, 10.0, 15.0, 20.0), div_x=(4.0, 8.0, 12.0),
+                    deadzone=(0.0, 1.0, 2.0, 4.0), max_step=(1, 2, 3),
+                    hold_grace=(0.02, 0.03, 0.04, 0.05, 0.07, 0.10),
+                    click_gap=(0.01, 0.02, 0.03, 0.04, 0.06))
+WINDOW = 0.25  # a tick this soon after an MMB or a release means the hand never left
+METRICS = ("mmb", "false_mmb", "cutouts", "release_ms", "frames", "interval_cv", "step_cv")
+ACC = ("mmb", "false_mmb", "cutouts", "releases", "release_s", "gaps", "gap_s", "gap_ss", "frames", "step_s", "step_ss")
+TICKS = (E.REL_WHEEL, E.REL_WHEEL_HI_RES, E.REL_HWHEEL_HI_RES)
+
+EVTEST_LINE = re.compile(rb"Event: time (\d+\.\d+), (?:type (\d+) \([^)]*\), code (\d+) \([^)]*\), value (-?\d+)|\S+ (SYN_\w+))")
+SYN_CODES = {b"SYN_REPORT": E.SYN_REPORT, b"SYN_CONFIG": 1, b"SYN_MT_REPORT": 2, b"SYN_DROPPED": E.SYN_DROPPED}
+INPUT_EVENT = struct.Struct("llHHi")  # struct input_event, as read from /dev/input/eventN
+if np is not None:
+    REC_DTYPE = np.dtype([("ts", "<f8"), ("type", "<u2"), ("code", "<u2"), ("value", "<i4"), ("src", "<u4")])
+    EVENT_DTYPE = np.dtype([("sec", "i8"), ("usec", "i8"), ("type", "u2"), ("code", "u2"), ("value", "i4")])
+
+def load_trace(path):
+    # Capture file, raw input_event dump or evtest output -> packed CAPTURE_REC records.
+    with open(path, "rb") as f: data = f.read()
+    if data.startswith((CAPTURE_MAGIC, CAPTURE_MAGIC_V1)):
+        return bytes(load_capture(path))
+    if b"\0" not in data[:4096]:
+        recs = []
+        for m in EVTEST_LINE.finditer(data):
+            ts, t, c, v, syn = m.groups()
+            if syn: recs.append(CAPTURE_REC.pack(float(ts), E.EV_SYN, SYN_CODES[syn], 0, 0))
+            else: recs.append(CAPTURE_REC.pack(float(ts), int(t), int(c), int(v), 0))
+        if not recs: raise ValueError(f"{path}: no evtest events found")
+        return b"".join(recs)
+    n = len(data) // INPUT_EVENT.size
+    if np is not None:
+        ev, out = np.frombuffer(data, EVENT_DTYPE, n), np.empty(n, REC_DTYPE)
+        out["ts"] = ev["sec"] + ev["usec"] * 1e-6
+        for k in ("type", "code", "value"): out[k] = ev[k]
+        out["src"] = 0
+        return out.tobytes()
+    return b"".join(CAPTURE_REC.pack(s + u * 1e-6, t, c, v, 0)
+                    for s, u, t, c, v in INPUT_EVENT.iter_unpack(data[:n * INPUT_EVENT.size]))
+
+def split_sources(records):
+    # One trace per source node, since each had a machine of its own.
+    size, by = CAPTURE_REC.size, {}
+    for i, r in enumerate(CAPTURE_REC.iter_unpack(records)): by.setdefault(r[4], []).append(i)
+    if len(by) <= 1: return [records]
+    return [b"".join(records[i * size:(i + 1) * size] for i in idx) for _, idx in sorted(by.items())]
+
+def parse_values(spec):
+    # "0.02,0.04,0.08" or "start:stop:step" (stop included)
+    if spec.count(":") == 2:
+        a, b, s = map(float, spec.split(":"))
+        return [round(a + i * s, 9) for i in range(int(math.floor((b - a) / s + 1e-9)) + 1)]
+    return [json.loads(v) for v in spec.split(",")]
+
+def combinations(base, grid):
+    keys = list(grid)
+    return [dict(base, **dict(zip(keys, vals))) for vals in itertools.product(*(grid[k] for k in keys))]
+
+def vectorized(p):
+    # The closed-form MMB/release decisions hold for the plain fixed-window
+    # machine whose idle timeout never beats the hold release.
+    return np is not None and not p["pace_hz"] and not p["adaptive"] and p["scroll_idle"] >= p["hold_grace"]
+
+def summarize(acc):
+    def cv(n, s, ss):
+        if n < 2 or not s: return 0.0
+        m = s / n
+        return float(math.sqrt(max(0.0, ss / n - m * m)) / m)
+    return dict(mmb=int(acc["mmb"]), false_mmb=int(acc["false_mmb"]), cutouts=int(acc["cutouts"]),
+                release_ms=float(acc["release_s"] / acc["releases"] * 1e3) if acc["releases"] else 0.0,
+                frames=int(acc["frames"]), interval_cv=cv(acc["gaps"], acc["gap_s"], acc["gap_ss"]),
+                step_cv=cv(acc["frames"], acc["step_s"], acc["step_ss"]))
+
+class SweepSink(CaptureSink):
+    # CaptureSink that also keeps where each MMB and hold release came from.
+    def __init__(self):
+        super().__init__()
+        self.mmb = []
+
+    def note(self, cat, src_ts):
+        if cat == LAT_MMB: self.mmb.append(src_ts)
+
+    def mark(self, cat, src_ts): self.marks.append((cat, src_ts, self.now))
+
+class Trace:
+    # One session, decoded once per worker.
+    def __init__(self, records):
+        self.records = records
+        self.ticks = [ts for ts, t, c, v in self.kept() if t == E.EV_REL and c in TICKS]
+        if np is not None: self.decode()
+
+    def kept(self):
+        # The events the machine acts on: after SYN_DROPPED it ignores all but SYN.
+        dropped = False
+        for ts, t, c, v, _ in CAPTURE_REC.iter_unpack(self.records):
+            if t == E.EV_SYN:
+                if c == E.SYN_REPORT: dropped = False
+                elif c == E.SYN_DROPPED: dropped = True
+            elif dropped:
+                continue
+            yield ts, t, c, v
+
+    def next_tick(self, ts):
+        i = bisect.bisect_right(self.ticks, ts)
+        return self.ticks[i] if i < len(self.ticks) else math.inf
+
+    def decode(self):
+        a = np.frombuffer(self.records, REC_DTYPE)
+        ts, typ, code, val = a["ts"], a["type"].astype(np.int64), a["code"].astype(np.int64), a["value"]
+        pos = np.arange(len(a))
+        syn = (typ == E.EV_SYN) & ((code == E.SYN_REPORT) | (code == E.SYN_DROPPED))
+        last = np.maximum.accumulate(np.where(syn, pos, -1))
+        prev = np.concatenate(([-1], last[:-1]))
+        drop = (typ != E.EV_SYN) & (prev >= 0) & (code[np.maximum(prev, 0)] == E.SYN_DROPPED)
+        rel = (typ == E.EV_REL) & ~drop
+        tick = rel & np.isin(code, TICKS)
+        motion = rel & ((code == E.REL_Y) | (code == E.REL_X))
+        self.tick_pos, self.tick_ts = pos[tick], ts[tick]
+        self.tick8 = code[tick] == E.REL_WHEEL
+        self.m_pos, self.m_ts = pos[motion], ts[motion]
+        self.m_y, self.m_val = code[motion] == E.REL_Y, val[motion].astype(np.float64)
+        # Output is flushed on the frame's SYN_REPORT and thrown away on SYN_DROPPED.
+        syn_pos = pos[syn]
+        f = np.searchsorted(syn_pos, self.m_pos)
+        self.m_frame = np.where(f < len(syn_pos), f, -1)
+        self.f_ts, self.f_keep = ts[syn], code[syn] == E.SYN_REPORT
+
+    def timing(self, hold, click, window):
+        # MMB and hold release decisions of the fixed-window machine, straight
+        # from the tick times: ScrollMachine.feed/expire without the loop.
+        T, is8, inf = self.tick_ts, self.tick8, math.inf
+        t8 = T[is8]
+        prev8 = np.concatenate(([0.0], t8[:-1]))
+        next8 = np.concatenate((t8[1:], [inf]))
+        f8 = t8 + click
+        fires = ((t8 - prev8) > click) & (f8 <= next8)
+        nxt = np.concatenate((T, [inf]))[np.searchsorted(T, t8, "right")]
+        acc = dict.fromkeys(ACC, 0.0)
+        acc["mmb"], acc["false_mmb"] = int(fires.sum()), int((fires & (nxt - t8 <= window)).sum())
+        if not len(T): return acc, np.zeros(0, np.int64), np.zeros(0, np.int64)
+        # Per tick: the end of the scroll it (re)starts, unless a later tick
+        # comes first. j = -1 (no code 8 yet) lands on the padding.
+        j = np.cumsum(is8) - 1
+        f = np.where(np.append(fires, False)[j], np.append(f8, inf)[j], inf)
+        f = np.where(f > T, f, inf)
+        rts = T + hold
+        end = np.minimum(rts, f)
+        nextT = np.concatenate((T[1:], [inf]))
+        released = (rts <= nextT) & ~(f <= rts)
+        cut = released & (nextT - T <= window)
+        good = released & ~cut
+        acc["cutouts"], acc["releases"] = int(cut.sum()), int(good.sum())
+        acc["release_s"] = float((rts - T)[good].sum())
+        begin = np.concatenate(([True], T[1:] >= end[:-1]))
+        seg = np.maximum.accumulate(np.where(begin, np.arange(len(T)), 0))
+        # Motion in scroll mode, tagged with the scroll it belongs to.
+        k = np.searchsorted(self.tick_pos, self.m_pos) - 1
+        kk = np.maximum(k, 0)
+        return acc, np.flatnonzero((k >= 0) & (self.m_ts < end[kk])), seg[kk]
+
+    def output(self, active, seg, outs, window):
+        # Run the scroll-mode motion through every output tuning at once; one
+        # array lane per combination, same arithmetic as ScrollMachine.feed.
+        n = len(outs)
+        q = np.array([120.0 if p["hires"] else 1.0 for p in outs])
+        dy = np.array([float(p["div_y"]) for p in outs]); dx = np.array([float(p["div_x"]) for p in outs])
+        dz = np.array([float(p["deadzone"]) for p in outs])
+        cap = np.array([float(p["max_step"]) for p in outs]) * q
+        ry, rx, mag, last = np.zeros(n), np.zeros(n), np.zeros(n), np.full(n, -math.inf)
+        acc = {k: np.zeros(n) for k in ("gaps", "gap_s", "gap_ss", "frames", "step_s", "step_ss")}
+        cur_seg = cur_frame = -1
+
+        def flush(fr):
+            if fr >= 0 and self.f_keep[fr]:
+                ts = self.f_ts[fr]
+                out = mag > 0
+                gap = ts - last
+                ok = out & (gap <= window)
+                g = np.where(ok, gap, 0.0)
+                acc["gaps"] += ok; acc["gap_s"] += g; acc["gap_ss"] += g * g
+                acc["frames"] += out; acc["step_s"] += mag; acc["step_ss"] += mag * mag
+                last[out] = ts
+            mag[:] = 0.0
+
+        m_y, m_val, m_frame = self.m_y, self.m_val, self.m_frame
+        for i in active:
+            if seg[i] != cur_seg:  # begin_scroll clears the remainders
+                cur_seg = seg[i]; ry[:] = 0.0; rx[:] = 0.0
+            if m_frame[i] != cur_frame:
+                flush(cur_frame); cur_frame = m_frame[i]
+            r, d = (ry, dy) if m_y[i] else (rx, dx)
+            r += m_val[i]
+            step = np.clip(np.trunc(r * q / d), -cap, cap) * (np.abs(r) >= dz)
+            r -= step * d / q
+            mag += np.abs(step)
+        flush(cur_frame)
+        return acc
+
+    def sweep_vector(self, timing, outs, window):
+        hold, click = timing
+        acc, active, seg = self.timing(hold, click, window)
+        return dict(acc, **self.output(active, seg, outs, window))
+
+    def sweep_exact(self, p, window):
+        sink = SweepSink()
+        frames = replay(self.records, p, sink=sink)
+        codes = (E.REL_WHEEL_HI_RES, E.REL_HWHEEL_HI_RES) if p["hires"] else (E.REL_WHEEL, E.REL_HWHEEL)
+        acc, last = dict.fromkeys(ACC, 0.0), -math.inf
+        for src in sink.mmb:
+            acc["mmb"] += 1; acc["false_mmb"] += self.next_tick(src) - src <= window
+        for cat, src, now in sink.marks:
+            if cat != LAT_RELEASE: continue
+            if self.next_tick(src) - src <= window: acc["cutouts"] += 1
+            else: acc["releases"] += 1; acc["release_s"] += now - src
+        for ts, evs in frames:
+            mag = sum(abs(v) for t, c, v in evs if t == E.EV_REL and c in codes)
+            if not mag: continue
+            gap = ts - last
+            if gap <= window: acc["gaps"] += 1; acc["gap_s"] += gap; acc["gap_ss"] += gap * gap
+            acc["frames"] += 1; acc["step_s"] += mag; acc["step_ss"] += mag * mag
+            last = ts
+        return acc
+
+_traces, _window = [], WINDOW
+
+def _init(traces, window):
+    global _traces, _window
+    _traces, _window = [Trace(r) for r in traces], window
+
+def _run_vector(timing, combos):
+    total = None
+    for tr in _traces:
+        acc = tr.sweep_vector(timing, [p for _, p in combos], _window)
+        total = acc if total is None else {k: total[k] + acc[k] for k in ACC}
+    return [(i, summarize({k: v[j] if np.ndim(v) else v for k, v in total.items()})) for j, (i, _) in enumerate(combos)]
+
+def _run_exact(combos):
+    out = []
+    for i, p in combos:
+        accs = [tr.sweep_exact(p, _window) for tr in _traces]
+        out.append((i, summarize({k: sum(a[k] for a in accs) for k in ACC})))
+    return out
+
+def sweep(traces, combos, jobs=None, window=WINDOW, exact=False, chunk=64):
+    # -> one metrics dict per combination, in order. Combinations sharing the
+    # MMB/release windows are evaluated together; the rest are replayed.
+    groups, ref = {}, []
+    for i, p in enumerate(combos):
+        if not exact and vectorized(p): groups.setdefault((p["hold_grace"], p["click_gap"]), []).append((i, p))
+        else: ref.append((i, p))
+    tasks = [(_run_vector, (t, g[k:k + chunk * 16])) for t, g in groups.items() for k in range(0, len(g), chunk * 16)]
+    tasks += [(_run_exact, (ref[k:k + chunk],)) for k in range(0, len(ref), chunk)]
+    jobs = jobs or os.cpu_count() or 1
+    out = [None] * len(combos)
+    if jobs == 1:
+        _init(traces, window)
+        results = (fn(*args) for fn, args in tasks)
+    else:
+        ex = ProcessPoolExecutor(jobs, initializer=_init, initargs=(traces, window))
+        results = (f.result() for f in [ex.submit(fn, *args) for fn, args in tasks])
+    try:
+        for res in results:
+            for i, m in res: out[i] = m
+    finally:
+        if jobs != 1: ex.shutdown()
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Sweep scroll/MMB tuning over recorded sessions.")
+    ap.add_argument("captures", nargs="+", help="--record capture, raw /dev/input/eventN dump or evtest output")
+    ap.add_argument("--config", help="JSON config with the values that are not swept")
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="fix one tuning value")
+    ap.add_argument("--grid", action="append", default=[], metavar="KEY=V1,V2|START:STOP:STEP",
+                    help="values to sweep for KEY (repeatable; default: a grid around the defaults)")
+    ap.add_argument("--window", type=float, default=WINDOW,
+                    help="a tick this soon after an MMB or release counts it as false (default %(default)s s)")
+    ap.add_argument("--sort", default="false_mmb,cutouts,step_cv,release_ms", help="metrics to rank by, best first")
+    ap.add_argument("--top", type=int, default=20, help="rows to print")
+    ap.add_argument("-j", "--jobs", type=int, help="worker processes (default: all CPUs)")
+    ap.add_argument("--exact", action="store_true", help="replay every combination through the state machine")
+    ap.add_argument("--out", help="write every combination and its metrics as JSON")
+    a = ap.parse_args(argv)
+
+    base = {k: DEFAULTS[k] for k in TUNING}
+    if a.config:
+        cfg = json.loads(open(a.config).read())
+        base.update({k: cfg[k] for k in TUNING if k in cfg})
+    for kv in a.set:
+        k, _, v = kv.partition("=")
+        if k not in TUNING: ap.error(f"unknown tuning key: {k}")
+        base[k] = json.loads(v)
+    grid = {}
+    for kv in a.grid:
+        k, _, v = kv.partition("=")
+        if k not in TUNING: ap.error(f"unknown tuning key: {k}")
+        grid[k] = parse_values(v)
+    grid = grid or dict(DEFAULT_GRID)
+    sort = a.sort.split(",")
+    if set(sort) - set(METRICS): ap.error(f"unknown metric in --sort; choose from {', '.join(METRICS)}")
+
+    traces = [t for p in a.captures for t in split_sources(load_trace(p))]
+    combos = combinations(base, grid)
+    t = time.perf_counter()
+    res = sweep(traces, combos, a.jobs, a.window, a.exact)
+    dt = time.perf_counter() - t
+    n = sum(len(r) for r in traces) // CAPTURE_REC.size
+    fast = sum(1 for p in combos if not a.exact and vectorized(p))
+    print(f"{len(combos)} combinations x {n} events in {dt:.1f} s ({fast} vectorized"
+          f"{'' if np is not None else ', numpy not installed'})", file=sys.stderr)
+
+    rows = sorted(zip(combos, res), key=lambda r: [r[1][k] for k in sort])
+    keys = list(grid)
+    print("  ".join(f"{k:>10}" for k in keys + list(METRICS)))
+    for p, m in rows[:a.top]:
+        print("  ".join(f"{v:>10g}" if isinstance(v, (int, float)) else f"{v!s:>10}"
+                        for v in [p[k] for k in keys] + [m[k] for k in METRICS]))
+    if a.out:
+        with open(a.out, "w") as f:
+            json.dump([dict({k: p[k] for k in keys}, **m) for p, m in rows], f, indent=1)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())